@@ -0,0 +1,191 @@
+import hashlib
+import json
+import time
+import warnings
+import pandas as pd
+from modules.CVACalculator import CVACalculator, PricingParameters
+from modules.ResponseHandler import AsyncEndpointRequest
+
+CVA_ENDPOINT = "data/quantitative-analytics/v1/async-cva"
+CACHE_NAMESPACE = "cva"
+GRID_COLUMNS = ["Portfolio", "ValuationDate", "SimulationCount"]
+
+
+def request_key(body):
+    """Hash of a request body, independent of dict key order."""
+    return hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+def _result_frame(response):
+    """DataFrame of a CVA result payload ({"headers": [...], "data": [...]}); KeyError/TypeError otherwise."""
+    return pd.DataFrame(data=response["data"], columns=[h["name"] for h in response["headers"]])
+
+
+class _SharedFragments(CVACalculator):
+    """CVACalculator that builds each CSA and credit curve once per batch and reuses it in every request body."""
+
+    def __init__(self):
+        self._csas = {}
+        self._credit_curves = {}
+        super().__init__()
+
+    def _create_csa(self, csaTag, details):
+        key = (csaTag, details.get("name"), details.get("CollateralCurrency"), details.get("RecoveryInstrument"))
+        if key not in self._csas:
+            self._csas[key] = super()._create_csa(csaTag, details)
+        return self._csas[key]
+
+    def _create_credit_curve(self, assignment_tag, curve_id, recovery_rate):
+        key = (assignment_tag, curve_id, recovery_rate)
+        if key not in self._credit_curves:
+            self._credit_curves[key] = super()._create_credit_curve(assignment_tag, curve_id, recovery_rate)
+        return self._credit_curves[key]
+
+    def prepare(self, portfolio, pricing_parameters, entity):
+        self._reset_state()
+        self.entity = entity.to_dict()
+        self.universe = portfolio.universe
+        self.counterparties = portfolio.counterparties.to_dict()
+        return self._prepare_cva_request_body(pricing_parameters)
+
+
+class BatchCVARunner:
+    """Runs CVA for a grid of portfolios x valuation dates x simulation counts in one batch.
+
+    The universe filter, CSAs, market-data assignments and credit curves are built once per
+    (portfolio, valuation date) and shared by every simulation count; CSAs and credit curves common to several
+    portfolios are built once for the whole batch. Identical request bodies are sent once, results are kept for
+    later runs (and in `cache`, e.g. the root ResponseCache, if given), and the remaining jobs are submitted
+    concurrently through AsyncEndpointRequest, which caps the requests in flight and backs off on 429/5xx.
+
+        runner = BatchCVARunner(entity, max_concurrency=8)
+        results = runner.run({"Swaps": portfolio}, ["2024-06-28", "2024-12-31"], [1000, 5000], pricing_parameters)
+        print(runner.summary())
+    """
+
+    def __init__(self, entity, client=None, cache=None, max_concurrency=8):
+        self.entity = entity
+        self.client = client if client is not None else AsyncEndpointRequest(max_concurrency=max_concurrency)
+        self.cache = cache
+        self._fragments = _SharedFragments()
+        self._bodies = {}
+        self._results = {}
+        self.stats = {}
+
+    def grid(self, portfolios, valuation_dates, simulation_counts, pricing_parameters):
+        """(portfolio name, portfolio, PricingParameters) for every grid point; other parameters are copied from
+        `pricing_parameters`. `portfolios` is a {name: portfolio} dict or a list (named by portfolio_code)."""
+        if not isinstance(portfolios, dict):
+            portfolios = {getattr(portfolio, "portfolio_code", None) or i: portfolio
+                          for i, portfolio in enumerate(portfolios)}
+        points = []
+        for name, portfolio in portfolios.items():
+            for valuation_date in valuation_dates:
+                for simulation_count in simulation_counts:
+                    parameters = PricingParameters(
+                        valuation_date, simulation_count, pricing_parameters.self_reference_entity,
+                        pricing_parameters.self_recovery_rate_percent, pricing_parameters.report_ccy,
+                        pricing_parameters.numeraire_type, dict(pricing_parameters.extended_params))
+                    points.append((name, portfolio, parameters))
+        return points
+
+    def _prepare(self, name, portfolio, parameters):
+        # Keyed on what the body is built from, so an edited portfolio under the same name is prepared again
+        shared = {k: v for k, v in parameters.to_dict().items() if k != "simulationCount"}
+        key = request_key({"universe": portfolio.universe, "counterparties": portfolio.counterparties.to_dict(),
+                           "pricingParameters": shared})
+        if key not in self._bodies:
+            self._bodies[key] = self._fragments.prepare(portfolio, parameters, self.entity)
+        return {**self._bodies[key], "pricingParameters": parameters.to_dict()}
+
+    def _plan(self, points):
+        # jobs: (name, parameters, request key or None, preparation error); pending: request key -> body to send
+        jobs, pending = [], {}
+        self.stats = {"jobs": len(points), "requests": 0, "deduplicated": 0, "cached": 0, "failed": 0}
+        self._start = time.perf_counter()
+        for name, portfolio, parameters in points:
+            try:
+                body = self._prepare(name, portfolio, parameters)
+            except Exception as e:
+                jobs.append((name, parameters, None, e))
+                continue
+            key = request_key(body)
+            jobs.append((name, parameters, key, None))
+            if key in pending:
+                self.stats["deduplicated"] += 1
+            elif key in self._results:
+                self.stats["cached"] += 1
+            else:
+                cached = None if self.cache is None else self.cache.get(CACHE_NAMESPACE, key)
+                if cached is not None:
+                    self._results[key] = cached
+                    self.stats["cached"] += 1
+                else:
+                    pending[key] = body
+        self.stats["requests"] = len(pending)
+        return jobs, pending
+
+    def _requests(self, pending):
+        return [(CVA_ENDPOINT, "POST", body) for body in pending.values()]
+
+    def _collect(self, jobs, pending, responses):
+        # A valuation date in the past prices on closed market data, so its result never changes: cache it for good
+        today = pd.Timestamp.today().normalize()
+        historical = {key: pd.Timestamp(parameters.valuation_date).normalize() < today
+                      for _, parameters, key, _ in jobs if key is not None}
+        errors = {}
+        for key, response in zip(pending, responses):
+            if not isinstance(response, BaseException):
+                try:
+                    _result_frame(response)
+                except (KeyError, TypeError, ValueError) as e:
+                    # e.g. a 200 answered synchronously with an error payload: reported, never cached
+                    response = ValueError(f"Unexpected CVA response ({e!r}): {str(response)[:200]}")
+            if isinstance(response, BaseException):
+                errors[key] = response
+                continue
+            self._results[key] = response
+            if self.cache is not None:
+                self.cache.put(CACHE_NAMESPACE, key, response, immutable=historical.get(key, False))
+
+        frames = []
+        for name, parameters, key, error in jobs:
+            error = error if key is None else errors.get(key)
+            if error is None:
+                try:
+                    df = _result_frame(self._results[key])
+                except (KeyError, TypeError, ValueError) as e:
+                    error = ValueError(f"Unexpected CVA response ({e!r})")
+            if error is not None:
+                warnings.warn(f"CVA calculation failed for {name} on {parameters.valuation_date.date()} "
+                              f"with {parameters.simulation_count} simulations: {error}")
+                self.stats["failed"] += 1
+                df = pd.DataFrame({"JobError": [str(error)]})
+            df.insert(0, "Portfolio", name)
+            df.insert(1, "ValuationDate", pd.Timestamp(parameters.valuation_date))
+            df.insert(2, "SimulationCount", parameters.simulation_count)
+            frames.append(df)
+
+        self.stats["seconds"] = time.perf_counter() - self._start
+        self.stats["jobs_per_minute"] = 60 * self.stats["jobs"] / max(self.stats["seconds"], 1e-9)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=GRID_COLUMNS)
+
+    def run(self, portfolios, valuation_dates, simulation_counts, pricing_parameters):
+        """One row per (portfolio, valuation date, simulation count, CSA); failed jobs get a JobError row."""
+        jobs, pending = self._plan(self.grid(portfolios, valuation_dates, simulation_counts, pricing_parameters))
+        responses = self.client.run_many(self._requests(pending)) if pending else []
+        return self._collect(jobs, pending, responses)
+
+    async def run_async(self, portfolios, valuation_dates, simulation_counts, pricing_parameters):
+        """`run` for a running event loop, e.g. `await runner.run_async(...)` in a notebook."""
+        jobs, pending = self._plan(self.grid(portfolios, valuation_dates, simulation_counts, pricing_parameters))
+        responses = await self.client.submit_many(self._requests(pending)) if pending else []
+        return self._collect(jobs, pending, responses)
+
+    def summary(self):
+        s = self.stats
+        if not s:
+            return "No batch run yet"
+        return (f"{s['jobs']} jobs in {s['seconds']:.1f}s ({s['jobs_per_minute']:.1f} jobs/minute): "
+                f"{s['requests']} requests sent, {s['deduplicated']} deduplicated, {s['cached']} from cache, "
+                f"{s['failed']} failed")
@@ -0,0 +1,112 @@
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 resets connections when many jobs are submitted at once
+    request_queue_size = 128
+
+
+class LocalJobServer:
+    """Offline stand-in for an async LSEG endpoint, to test AsyncEndpointRequest without a session.
+
+    POST <any path> accepts a job (202 + Location of its status); GET /status/<id> answers "running" (with a
+    Retry-After of `retry_after` seconds, if set) until `job_seconds` have passed, then "succeeded" with the
+    resourceLocation /results/<id>; GET /results/<id> returns {"headers", "data"} echoing the request body.
+    A body with "jobSeconds" overrides the duration and one with "fail": true makes the job fail.
+    `max_active` records the highest number of jobs running at the same time.
+
+        with LocalJobServer(job_seconds=0.5) as server:
+            client = AsyncEndpointRequest(UrllibTransport(server.url))
+    """
+
+    def __init__(self, job_seconds=1.0, retry_after=None, host="127.0.0.1", port=0):
+        self.job_seconds = job_seconds
+        self.retry_after = retry_after
+        self.jobs = {}
+        self.requests = 0
+        self.max_active = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _active(self, now):
+        return sum(1 for job in self.jobs.values() if job["start"] <= now < job["done"])
+
+    def _submit(self, body):
+        with self._lock:
+            job_id = next(self._ids)
+            now = time.monotonic()
+            self.jobs[job_id] = {"start": now, "done": now + body.get("jobSeconds", self.job_seconds),
+                                 "body": body, "failed": bool(body.get("fail"))}
+            self.max_active = max(self.max_active, self._active(now))
+        return job_id
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload=None, headers=None):
+                body = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                server.requests += 1
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                job_id = server._submit(body if isinstance(body, dict) else {"body": body})
+                self._reply(202, {"id": job_id}, {"Location": f"/status/{job_id}"})
+
+            def do_GET(self):
+                server.requests += 1
+                parts = self.path.strip("/").split("/")
+                job = server.jobs.get(int(parts[1])) if len(parts) == 2 and parts[1].isdigit() else None
+                if job is None:
+                    return self._reply(404, {"error": f"Unknown resource {self.path}"})
+                finished = time.monotonic() >= job["done"]
+                if parts[0] == "status":
+                    if not finished:
+                        headers = {} if server.retry_after is None else {"Retry-After": str(server.retry_after)}
+                        return self._reply(200, {"status": "running"}, headers)
+                    status = "failed" if job["failed"] else "succeeded"
+                    return self._reply(200, {"status": status, "resourceLocation": f"/results/{parts[1]}"})
+                if parts[0] == "results" and finished:
+                    return self._reply(200, {"headers": [{"name": "JobId"}, {"name": "Body"}],
+                                             "data": [[int(parts[1]), json.dumps(job["body"])]]})
+                return self._reply(202, {"status": "running"})
+
+        return Handler
@@ -1,4 +1,14 @@
+import asyncio
+import email.utils
+import json
+import math
+import random
 import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from lseg.data.delivery import endpoint_request
 
 class EndpointRequest:
@@ -31,4 +41,184 @@ class EndpointRequest:
             response = EndpointRequest.make_request(response_url)
             res_status = response.is_success
             time.sleep(1)
-        return response.data.raw
\ No newline at end of file
+        return response.data.raw
+
+class AsyncResponse:
+    def __init__(self, status_code, headers, data):
+        self.status_code = status_code
+        self.headers = {key.lower(): value for key, value in (headers or {}).items()}
+        self.data = data
+
+    @property
+    def is_success(self):
+        return 200 <= self.status_code < 300
+
+
+class LsegTransport:
+    """Sends requests through the lseg.data session (blocking), one worker thread per in-flight request."""
+
+    def send(self, url, method="GET", body_params=None):
+        method = endpoint_request.RequestMethod.GET if method == "GET" else endpoint_request.RequestMethod.POST
+        response = endpoint_request.Definition(
+            method=method,
+            url=url,
+            header_parameters={"Content-Type": "application/json"},
+            body_parameters=body_params
+        ).get_data()
+        try:
+            data = response.data.raw
+        except Exception:
+            data = None
+        return AsyncResponse(response.raw.status_code, dict(response.raw.headers), data)
+
+
+class UrllibTransport:
+    """Plain-HTTP transport (e.g. for LocalJobServer); relative URLs are resolved against `base_url`."""
+
+    def __init__(self, base_url="", timeout=30):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def send(self, url, method="GET", body_params=None):
+        url = urllib.parse.urljoin(self.base_url, url)
+        body = None if body_params is None else json.dumps(body_params).encode()
+        request = urllib.request.Request(url, data=body, method=method,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status, headers, payload = response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as error:
+            status, headers, payload = error.code, dict(error.headers), error.read()
+        return AsyncResponse(status, headers, json.loads(payload) if payload else None)
+
+
+def _retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date); None if missing or malformed."""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            # A '-0000' zone parses as naive; HTTP dates are always UTC
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        seconds = (retry_at - datetime.now(timezone.utc)).total_seconds()
+    return max(seconds, 0.0) if math.isfinite(seconds) else None
+
+
+class AsyncEndpointRequest:
+    """asyncio client for the async (202 Accepted + status location) endpoints, e.g. async-cva.
+
+    Many jobs are submitted and awaited concurrently (at most `max_concurrency` requests in flight); each job's
+    status is polled with exponential backoff and jitter, honouring Retry-After, and its result is returned as
+    soon as it is ready instead of after fixed one-second sleeps. A request answered 429/502/503/504 (or failing
+    to connect) is retried at most `max_retries` times, and no wait runs past `timeout` seconds after submission.
+    Blocking transports run in the client's own thread pool of `max_concurrency` threads (the default asyncio pool
+    has only cpu_count + 4).
+    """
+
+    RETRY_STATUSES = {429, 502, 503, 504}
+
+    def __init__(self, transport=None, max_concurrency=8, initial_delay=0.1, max_delay=5.0, backoff=2.0,
+                 jitter=0.5, timeout=600, max_retries=5):
+        self.transport = transport if transport is not None else LsegTransport()
+        self.max_concurrency = max_concurrency
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._semaphore = None
+        self._semaphore_loop = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def _delay(self, attempt, response=None):
+        retry_after = None if response is None else _retry_after_seconds(response.headers.get("retry-after"))
+        if retry_after is not None:
+            return retry_after
+        # The exponent stops at the attempt that reaches max_delay, so a long poll never overflows the power
+        if self.backoff > 1 and 0 < self.initial_delay < self.max_delay:
+            attempt = min(attempt, math.ceil(math.log(self.max_delay / self.initial_delay, self.backoff)))
+        delay = min(self.max_delay, self.initial_delay * self.backoff ** attempt)
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def _loop_semaphore(self):
+        # An asyncio.Semaphore belongs to the event loop it was first used in: make one per loop
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def make_request(self, url, method="GET", body_params=None, deadline=None):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if deadline is None else deadline
+        attempt = 0
+        while True:
+            try:
+                async with self._loop_semaphore():
+                    response = await loop.run_in_executor(self._executor, self.transport.send, url, method,
+                                                          body_params)
+            except OSError:
+                # Connection-level failures (reset, refused, timed out) are retried like a 503
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            if response is not None and (response.status_code not in self.RETRY_STATUSES
+                                         or attempt >= self.max_retries):
+                break
+            attempt = await self._wait(attempt, response, deadline, url)
+        if response.status_code in [200, 202]:
+            return response
+        raise Exception(f"Error: {response.status_code} - {response.data}")
+
+    async def wait_for_response(self, response, deadline=None):
+        if deadline is None:
+            deadline = asyncio.get_running_loop().time() + self.timeout
+        status_url = response.headers["location"]
+        attempt = 0
+        while True:
+            status_response = await self.make_request(status_url, deadline=deadline)
+            status = (status_response.data or {}).get("status")
+            if status == "succeeded":
+                break
+            if status == "failed":
+                raise Exception(f"Job at {status_url} failed: {status_response.data}")
+            attempt = await self._wait(attempt, status_response, deadline, status_url)
+
+        response_url = status_response.data["resourceLocation"]
+        attempt = 0
+        while True:
+            response = await self.make_request(response_url, deadline=deadline)
+            if response.status_code == 200:
+                return response.data
+            attempt = await self._wait(attempt, response, deadline, response_url)
+
+    async def _wait(self, attempt, response, deadline, url):
+        delay = self._delay(attempt, response)
+        if asyncio.get_running_loop().time() + delay > deadline:
+            raise TimeoutError(f"No result from {url} within {self.timeout}s")
+        await asyncio.sleep(delay)
+        return attempt + 1
+
+    async def submit(self, url, method="POST", body_params=None):
+        """Result payload of one request: awaited through the status location if the endpoint answers 202."""
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        response = await self.make_request(url, method, body_params, deadline)
+        if response.status_code == 202:
+            return await self.wait_for_response(response, deadline)
+        return response.data
+
+    async def submit_many(self, requests, return_exceptions=True):
+        """Results of (url, method, body_params) requests, in order; failures are returned as exceptions."""
+        return await asyncio.gather(*(self.submit(*request) for request in requests),
+                                    return_exceptions=return_exceptions)
+
+    def run_many(self, requests, return_exceptions=True):
+        """Blocking `submit_many` for scripts (in a notebook, `await client.submit_many(...)` instead)."""
+        return asyncio.run(self.submit_many(requests, return_exceptions))
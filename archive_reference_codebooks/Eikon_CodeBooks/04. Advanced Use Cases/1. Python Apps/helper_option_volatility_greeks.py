@@ -50,8 +50,10 @@ class MyException(Exception):
 
 class get_options_RIC():
 
-    def __init__(self): # Constroctor
-        return None
+    def __init__(self, cache=None): # Constroctor
+        # `cache` is an optional `ResponseCache` (modules/ResponseCache.py at the root of the repo); without it every
+        # price request goes to `rd.get_history`.
+        self.cache = cache
 
 
     def _get_exchange_code(
@@ -135,7 +137,11 @@ class get_options_RIC():
     def _request_prices(self, ric, debug):
         prices = []
         try:    
-            prices = rd.get_history(ric, fields = ['BID','ASK','TRDPRC_1','SETTLE'])
+            if self.cache is None:
+                prices = rd.get_history(ric, fields = ['BID','ASK','TRDPRC_1','SETTLE'])
+            else:
+                # Expired options (RICs with a '^' expiry suffix) have a closed history that never needs refetching
+                prices = self.cache.get_history(ric, fields = ['BID','ASK','TRDPRC_1','SETTLE'], immutable='^' in ric)
         except rd.errors.RDError as err:
             if debug:
                 print(f'Constructed ric {ric} -  {err}')
@@ -440,7 +446,7 @@ class get_options_RIC():
                 if i < rnge:
                     if len(optn_ric) == 0 and (direction == None or direction == "+"):  # Try and find an Option RIC for a Strike `interval` above the given `strike`:
                         new_strike = (round(strike/round_to_nearest)*round_to_nearest)+i
-                        optn_ric = get_options_RIC().get_option_ric(
+                        optn_ric = get_options_RIC(self.cache).get_option_ric(
                             asset=asset, maturity=maturity, opt_type=opt_type, debug=debug,
                             strike=new_strike, exchange_not_supported_message_count=exchng_not_sprted_msg_cnt)
                         exchng_not_sprted_msg_cnt =+ 1
@@ -448,7 +454,7 @@ class get_options_RIC():
                             print(f"{i} new_strike: {new_strike}")
                     if len(optn_ric) == 0 and (direction == None or direction == "-"):  # Try and find an Option RIC for a Strike `interval` below the given `strike`:
                         new_strike = (round(strike/round_to_nearest)*round_to_nearest)-i
-                        optn_ric = get_options_RIC().get_option_ric(
+                        optn_ric = get_options_RIC(self.cache).get_option_ric(
                             asset=asset, maturity=maturity, opt_type=opt_type, debug=debug,
                             strike=new_strike, exchange_not_supported_message_count=exchng_not_sprted_msg_cnt)
                         if debug:
@@ -489,7 +495,8 @@ class IPA_Equity_Vola_n_Greeeks():
             search_batch_max = 90,
             slep= 0.6,
             corr=True,
-            hist_vol=True): # Constroctor
+            hist_vol=True,
+            cache=None): # Constroctor
         '''
         IPA_Equity_Vola_n_Greeeks() Python Class Version 1.0:
             This Class was built and tested in Python 3.11.3.
@@ -537,6 +544,7 @@ class IPA_Equity_Vola_n_Greeeks():
         self.slep=slep
         self.corr=corr
         self.hist_vol=hist_vol
+        self.cache=cache # Optional `ResponseCache` for the option price requests
         
 
     def initiate(
@@ -568,7 +576,7 @@ class IPA_Equity_Vola_n_Greeeks():
             print(f"maturity : {self.maturity}")
             print(f"original strike: {self.strike}")
 
-        _undrlying_optn_ric, new_strike = get_options_RIC().get_option_ric_through_strike_range(
+        _undrlying_optn_ric, new_strike = get_options_RIC(self.cache).get_option_ric_through_strike_range(
             asset=self.underlying,
             maturity=self.maturity,
             strike=self.strike,
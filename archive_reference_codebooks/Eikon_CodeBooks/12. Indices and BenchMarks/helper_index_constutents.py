@@ -1,67 +1,154 @@
 import refinitiv.data as rd
 import pandas as pd
-import copy
+import numpy as np
 
 rd.open_session()
 
 class IndexConstituents:
 
+    def __init__(self, cache=None):
+        # Optional `ResponseCache` (modules/ResponseCache.py at the root of the repo): constituents as of a past date
+        # and changes over a closed range are historical, so they are fetched once and kept
+        self.cache = cache
+
+    def _get_data(self, **request):
+        if self.cache is None:
+            return rd.get_data(**request)
+        return self.cache.get_data(**request)
+
     def get_historical_constituents(self, index, start, end):
         initial_constituents = self.get_constituents_as_of(index, start)
         constituent_changes = self.get_constituent_changes(index, start, end)
         historical_constituents = self.update_constituents(start, initial_constituents, constituent_changes)
         return historical_constituents
 
+    def get_membership(self, index, start, end):
+        # (RIC, Join Date, Leave Date) intervals; constituents as of start get start as their join date
+        self.get_historical_constituents(index, start, end)
+        return self.membership
+
     def get_constituents_as_of(self, ric, date):
-        initial_constituents = rd.get_data(universe=[f"0#{ric}({date.replace('-', '')})"], 
+        initial_constituents = self._get_data(universe=[f"0#{ric}({date.replace('-', '')})"],
                     fields=["TR.PriceClose"],
                     parameters={"SDATE":f"{date}", "EDATE":f"{date}"}
                 )
         initial_constituents = initial_constituents['Instrument'].to_list()
         return initial_constituents
-    
+
     def get_constituent_changes(self, ric, start, end):
 
-        const_changes  = rd.get_data(universe=[ric], 
+        const_changes  = self._get_data(universe=[ric],
                     fields = ["TR.IndexJLConstituentRIC.date", "TR.IndexJLConstituentRIC",
                             "TR.IndexJLConstituentName", "TR.IndexJLConstituentRIC.change"],
                     parameters={"SDATE":f"{start}","EDATE":f"{end}", 'IC':'B'}
                 )
-        
+
         return const_changes
 
     def update_constituents(self, start, constituents, constitent_changes):
-        
-        hist_constituents = pd.DataFrame([(start, ric) for ric in constituents], columns=['Date', 'RIC'])
-        for date in constitent_changes['Date'].unique():
-            const_changes_date = constitent_changes[constitent_changes['Date'] == date]
-            joiners = const_changes_date[const_changes_date['Change']=='Joiner']['Constituent RIC'].to_list()
-            leavers = const_changes_date[const_changes_date['Change']=='Leaver']['Constituent RIC'].to_list()
-            joiners_unique = list(set(joiners) - set(leavers))
-            leavers_unique = list(set(leavers) - set(joiners))
+        # Single pass over the change dates: the current members are an insertion-ordered dict of
+        # RIC -> join date, so joins/leaves are O(1) and every membership spell becomes one interval.
+        # The long (Date, RIC) frame is built once at the end instead of being concatenated per date.
+        active = dict.fromkeys(constituents, pd.Timestamp(start))
+        intervals = []
+        dates = [start] * len(active)
+        rics = list(active)
+
+        for date, const_changes_date in constitent_changes.groupby('Date', sort=True):
+            joiners = const_changes_date.loc[const_changes_date['Change'] == 'Joiner', 'Constituent RIC']
+            leavers = const_changes_date.loc[const_changes_date['Change'] == 'Leaver', 'Constituent RIC']
+            joiner_set, leaver_set = set(joiners), set(leavers)
+            joiners_unique = [ric for ric in dict.fromkeys(joiners) if ric not in leaver_set]
+            leavers_unique = [ric for ric in dict.fromkeys(leavers) if ric not in joiner_set]
+            date = pd.Timestamp(date)
             if len(joiners_unique) > 0:
-                constituents = self.add_joiner(constituents, joiners_unique)
+                self.add_joiner(active, joiners_unique, date)
             if len(leavers_unique) > 0:
-                constituents = self.remove_leaver(constituents, leavers_unique)
-            new_constituents = copy.deepcopy(constituents)
-            new_constituents_df =  pd.DataFrame([(str(date)[:10], ric) for ric in new_constituents], columns=['Date', 'RIC'])
-            hist_constituents = pd.concat([hist_constituents, new_constituents_df])
-        hist_constituents = hist_constituents.reset_index(drop = True)
-        
+                intervals += self.remove_leaver(active, leavers_unique, date)
+            dates += [str(date)[:10]] * len(active)
+            rics += list(active)
+
+        intervals += [(ric, joined, pd.NaT) for ric, joined in active.items()]
+        self.membership = MembershipIntervals(pd.DataFrame(intervals, columns=['RIC', 'Join Date', 'Leave Date']))
+        hist_constituents = pd.DataFrame({'Date': dates, 'RIC': rics})
+
         return hist_constituents
-    
-    def add_joiner(self, init_list, joiner_list):
+
+    def add_joiner(self, active, joiner_list, date=None):
         for joiner in joiner_list:
-            if joiner not in init_list:
-                init_list.append(joiner)
+            if joiner not in active:
+                active[joiner] = date
             else:
                 print(f'{joiner} joiner is already in the list')
-        return init_list
+        return active
 
-    def remove_leaver(self, init_list, leaver_list):
+    def remove_leaver(self, active, leaver_list, date=None):
+        # Returns the closed (RIC, Join Date, Leave Date) intervals
+        closed = []
         for leaver in leaver_list:
-            if leaver in init_list:
-                init_list.remove(leaver)
+            if leaver in active:
+                closed.append((leaver, active.pop(leaver), date))
             else:
                 print(f'{leaver} leaver is not in the list')
-        return init_list
\ No newline at end of file
+        return closed
+
+
+class MembershipIntervals:
+    # Point-in-time index membership stored as [Join Date, Leave Date) intervals (NaT leave = still a member).
+    # The member list after every join/leave date is built once in a single sweep, so "members as of D" is one
+    # bisection over those dates; per-RIC interval arrays answer is_member for many dates with one searchsorted.
+
+    def __init__(self, intervals):
+        intervals = intervals.sort_values(['Join Date', 'RIC'], kind='stable').reset_index(drop=True)
+        self.intervals = intervals
+        self.rics = intervals['RIC'].to_numpy(dtype=object)
+        self.joins = intervals['Join Date'].to_numpy(dtype='datetime64[ns]')
+        self.leaves = intervals['Leave Date'].fillna(pd.Timestamp.max).to_numpy(dtype='datetime64[ns]')
+        self._by_ric = intervals.groupby('RIC').indices
+        self._change_dates, self._snapshots = self._sweep()
+
+    def _sweep(self):
+        # Intervals enter the active dict in join order, so every snapshot keeps the (Join Date, RIC) order
+        change_dates = np.unique(np.r_[self.joins, self.leaves])
+        joined_at = np.searchsorted(change_dates, self.joins)
+        left_at = np.searchsorted(change_dates, self.leaves)
+        leave_order = np.argsort(left_at, kind='stable')
+        boundaries = np.arange(1, len(change_dates))
+        joining = np.split(np.arange(len(self.joins)), np.searchsorted(joined_at, boundaries))
+        leaving = np.split(leave_order, np.searchsorted(left_at[leave_order], boundaries))
+        active, snapshots = {}, []
+        for joined, left in zip(joining, leaving):
+            active.update(dict.fromkeys(joined.tolist()))
+            for position in left.tolist():
+                del active[position]
+            snapshots.append(tuple(self.rics[list(active)]))
+        return change_dates, snapshots
+
+    def members_as_of(self, date):
+        date = np.datetime64(pd.Timestamp(date), 'ns')
+        latest = np.searchsorted(self._change_dates, date, side='right') - 1
+        return list(self._snapshots[latest]) if latest >= 0 else []
+
+    def is_member(self, ric, dates):
+        dates = pd.DatetimeIndex(dates).to_numpy(dtype='datetime64[ns]')
+        positions = self._by_ric.get(ric)
+        if positions is None:
+            return np.zeros(len(dates), dtype=bool)
+        # A RIC's spells do not overlap, so the last spell joined by each date is the only candidate
+        latest = np.searchsorted(self.joins[positions], dates, side='right') - 1
+        candidate = positions[np.maximum(latest, 0)]
+        return (latest >= 0) & (dates < self.leaves[candidate])
+
+    def membership_mask(self, dates, rics=None):
+        # Date x RIC boolean mask: +1 at each spell's first date, -1 after its last, cumulative sum > 0
+        dates = pd.DatetimeIndex(dates)
+        rics = pd.Index(sorted(set(self.rics)) if rics is None else rics)
+        columns = rics.get_indexer(self.rics)
+        known = columns >= 0
+        values = dates.to_numpy(dtype='datetime64[ns]')
+        first = np.searchsorted(values, self.joins[known], side='left')
+        after = np.searchsorted(values, self.leaves[known], side='left')
+        changes = np.zeros((len(dates) + 1, len(rics)), dtype=np.int32)
+        np.add.at(changes, (first, columns[known]), 1)
+        np.add.at(changes, (after, columns[known]), -1)
+        return pd.DataFrame(np.cumsum(changes[:-1], axis=0) > 0, index=dates, columns=rics)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+BULK_DEAL_WINDOWS = (5, 10, 30, 60)
+
+
+class BulkDealFeatureBuilder:
+    """Rolling bulk-deal features for every stock on every trading day, maintained incrementally.
+
+    Per window W (in trading days) and symbol:
+        bulk_deal_count_<W>d        deals
+        bulk_net_value_<W>d         buy notional - sell notional
+        bulk_distinct_clients_<W>d  distinct clients with at least one deal
+        bulk_round_trips_<W>d       client round trips: the same client buying and selling the same stock on the
+                                    same day in matching size (within `round_trip_tolerance`), the intraday
+                                    pattern of HFT desks such as GRAVITON RESEARCH CAPITAL LLP
+
+    Deals are aggregated onto a trading-day x symbol grid, window sums come from prefix sums of that grid, and
+    distinct clients from merged per-(symbol, client) presence intervals accumulated in a difference array, so no
+    step filters the deal table per date. `update` with a newly landed yearly file only computes the new days,
+    reusing the last max(W) days of the grid as warm-up.
+
+    `symbols` fixes the columns (typically the modelling universe, e.g. `SymbolMaster.identifiers('ticker')` for
+    columns in node-id order); deals on other symbols are ignored.
+    """
+
+    def __init__(self, symbols, windows=BULK_DEAL_WINDOWS, round_trip_tolerance=0.0):
+        self.symbols = pd.Index(symbols)
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        self.round_trip_tolerance = round_trip_tolerance
+        self.calendar = pd.DatetimeIndex([])
+        self.daily = {name: np.zeros((0, len(self.symbols))) for name in ('deal_count', 'net_value', 'round_trips')}
+        self.presence = pd.DataFrame({'day': np.zeros(0, dtype=np.int64), 'symbol': np.zeros(0, dtype=np.int64),
+                                      'client': pd.Series([], dtype=str)})
+        self.features = {name: np.zeros((0, len(self.symbols)), dtype=np.float32) for name in self.feature_names}
+
+    @property
+    def feature_names(self):
+        return [f'bulk_{name}_{w}d' for w in self.windows
+                for name in ('deal_count', 'net_value', 'distinct_clients', 'round_trips')]
+
+    def update(self, deals, calendar=None):
+        """Adds deals dated after the last processed day; `calendar` defaults to business days up to the last deal."""
+        if len(deals) == 0:
+            return []
+        last_day = self.calendar[-1] if len(self.calendar) else None
+        if last_day is not None and deals['date'].min() <= last_day:
+            raise ValueError(f"Deals on or before {last_day.date()} are already processed; build a new "
+                             f"BulkDealFeatureBuilder to restate history")
+        if calendar is None:
+            first = deals['date'].min() if last_day is None else last_day + pd.offsets.BDay(1)
+            calendar = pd.bdate_range(first, deals['date'].max())
+        calendar = pd.DatetimeIndex(calendar)
+        if last_day is not None:
+            calendar = calendar[calendar > last_day]
+
+        t0 = len(self.calendar)
+        self.calendar = self.calendar.append(calendar)
+        for name in self.daily:
+            self.daily[name] = np.vstack([self.daily[name], np.zeros((len(calendar), len(self.symbols)))])
+
+        self._aggregate(deals, t0)
+        self._compute(t0)
+        return list(calendar)
+
+    def _aggregate(self, deals, t0):
+        # Deals on non-trading days count towards the next trading day
+        day = t0 + self.calendar[t0:].searchsorted(deals['date'].to_numpy(), side='left')
+        symbol = self.symbols.get_indexer(deals['symbol'].astype(str))
+        keep = (symbol >= 0) & (day < len(self.calendar))
+        is_buy = (deals['side'] == 'BUY').to_numpy()[keep]
+        # A deal whose quantity could not be parsed still counts, with no size
+        quantity = deals['quantity'].to_numpy(dtype=np.float64, na_value=0.0)[keep]
+        notional = quantity * deals['price'].to_numpy(dtype=np.float64)[keep]
+        day, symbol = day[keep], symbol[keep]
+        client = deals['client_name'].astype(str).to_numpy()[keep]
+
+        np.add.at(self.daily['deal_count'], (day, symbol), 1.0)
+        np.add.at(self.daily['net_value'], (day, symbol), np.where(is_buy, notional, -notional))
+
+        sides = pd.DataFrame({'day': day, 'symbol': symbol, 'client': client,
+                              'buy': np.where(is_buy, quantity, 0.0), 'sell': np.where(is_buy, 0.0, quantity)})
+        sides = sides.groupby(['day', 'symbol', 'client'], sort=False, observed=True).sum().reset_index()
+        size = np.maximum(sides['buy'], sides['sell'])
+        round_trip = ((sides['buy'] > 0) & (sides['sell'] > 0)
+                      & ((sides['buy'] - sides['sell']).abs() <= self.round_trip_tolerance * size))
+        trips = sides[round_trip]
+        np.add.at(self.daily['round_trips'], (trips['day'].to_numpy(), trips['symbol'].to_numpy()), 1.0)
+
+        self.presence = pd.concat([self.presence, sides[['day', 'symbol', 'client']]], ignore_index=True)
+
+    def _compute(self, t0):
+        T = len(self.calendar)
+        lo = max(0, t0 - max(self.windows))
+        days = np.arange(t0, T)
+        new = {}
+
+        for name, daily in self.daily.items():
+            prefix = np.zeros((T - lo + 1, len(self.symbols)))
+            np.cumsum(daily[lo:], axis=0, out=prefix[1:])
+            for w in self.windows:
+                first = np.maximum(days - w + 1, lo) - lo
+                new[f'bulk_{name}_{w}d'] = (prefix[days - lo + 1] - prefix[first]).astype(np.float32)
+
+        for w, distinct in self._distinct_clients(t0, lo).items():
+            new[f'bulk_distinct_clients_{w}d'] = distinct
+
+        for name in self.feature_names:
+            self.features[name] = np.vstack([self.features[name], new[name]])
+
+    def _distinct_clients(self, t0, lo):
+        """{W: distinct clients per (day, symbol) for days >= t0}, from presence intervals [day, day + W)."""
+        T = len(self.calendar)
+        records = self.presence[self.presence['day'] >= lo]
+        client = pd.factorize(records['client'])[0]
+        symbol, day = records['symbol'].to_numpy(), records['day'].to_numpy()
+        order = np.lexsort((day, client, symbol))
+        symbol, client, day = symbol[order], client[order], day[order]
+
+        # A client's presence intervals are cut at its next deal in the same stock so overlaps are counted once
+        same_pair = np.r_[(symbol[1:] == symbol[:-1]) & (client[1:] == client[:-1]), False]
+        next_day = np.where(same_pair, np.r_[day[1:], 0], np.iinfo(np.int64).max)
+
+        distinct = {}
+        for w in self.windows:
+            start = np.maximum(day, t0)
+            end = np.minimum(np.minimum(day + w, next_day), T)
+            live = start < end
+            diff = np.zeros((T - t0 + 1, len(self.symbols)))
+            np.add.at(diff, (start[live] - t0, symbol[live]), 1.0)
+            np.add.at(diff, (end[live] - t0, symbol[live]), -1.0)
+            distinct[w] = np.cumsum(diff, axis=0)[:-1].astype(np.float32)
+        return distinct
+
+    def frame(self, name):
+        """Date x symbol DataFrame of one feature."""
+        return pd.DataFrame(self.features[name], index=self.calendar, columns=self.symbols)
@@ -0,0 +1,166 @@
+import glob
+import hashlib
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+BULK_DEALS_DIR = 'data/bulk_deals_nse'
+BULK_DEALS_CACHE_DIR = 'data/cache/bulk_deals'
+
+HEADER_NAMES = {
+    'date': 'date',
+    'symbol': 'symbol',
+    'security_name': 'security_name',
+    'client_name': 'client_name',
+    'buy_sell': 'side',
+    'quantity_traded': 'quantity',
+    'trade_price_wght_avg_price': 'price',
+    'remarks': 'remarks',
+}
+CATEGORY_COLUMNS = ['symbol', 'security_name', 'client_name', 'side', 'remarks']
+
+
+def normalise_header(name):
+    """'Trade Price / Wght. Avg. Price ' -> 'trade_price_wght_avg_price'."""
+    cleaned = ''.join(c if c.isalnum() else ' ' for c in name.lower())
+    return '_'.join(cleaned.split())
+
+
+def parse_grouped_numbers(values):
+    """Parses digit-grouped strings ("14,17,288", "1,234.50") to float64 without any per-cell Python code.
+
+    The strings are laid out as a byte matrix as wide as the longest cell. Every digit is weighted by
+    10 ** (number of digits to its right), which gives the integer mantissa whatever the comma grouping, and the
+    mantissa is then divided by 10 ** (digits after the decimal point). Only digits, commas and one decimal point
+    are accepted: empty cells and anything else (signs, exponents, text) become NaN.
+    """
+    encoded = pd.Series(values).fillna('').astype(str).str.strip().str.encode('utf-8')
+    width = max(int(encoded.str.len().max()) if len(encoded) else 0, 1)
+    raw = np.asarray(encoded.to_numpy(), dtype=f'S{width}')
+    chars = raw.view(np.uint8).reshape(len(raw), width)
+    digits = (chars >= ord('0')) & (chars <= ord('9'))
+
+    is_dot = chars == ord('.')
+    # Bytes after the end of a shorter cell are 0 padding
+    allowed = digits | is_dot | (chars == ord(',')) | (chars == 0)
+    valid = allowed.all(axis=1) & digits.any(axis=1) & (is_dot.sum(axis=1) <= 1)
+
+    dot_at = np.where(is_dot.any(axis=1), is_dot.argmax(axis=1), width)
+    fraction_digits = (digits & (np.arange(width) > dot_at[:, None])).sum(axis=1)
+
+    exponent = np.cumsum(digits[:, ::-1], axis=1)[:, ::-1] - 1
+    weights = np.where(digits, np.power(10.0, np.maximum(exponent, 0)), 0.0)
+    mantissa = ((chars.astype(np.float64) - ord('0')) * weights).sum(axis=1)
+
+    result = mantissa / np.power(10.0, fraction_digits)
+    result[~valid] = np.nan
+    return result
+
+
+def parse_quantities(values):
+    """Whole-number quantities as nullable Int64: cells that are empty, malformed, fractional or too long to be
+    exact in float64 (2 ** 53 and above) are <NA>."""
+    parsed = parse_grouped_numbers(values)
+    parsed[(parsed != np.floor(parsed)) | (parsed >= 2.0 ** 53)] = np.nan
+    return pd.array(parsed, dtype='Int64')
+
+
+def parse_bulk_deal_file(path):
+    """One NSE Bulk-Deals CSV as a typed frame (date, symbol, security_name, client_name, side, quantity, price, remarks)."""
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    df.columns = [HEADER_NAMES.get(normalise_header(c), normalise_header(c)) for c in df.columns]
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].str.strip()
+    df['side'] = df['side'].str.upper()
+    df['remarks'] = df['remarks'].replace({'': '-'})
+
+    df['date'] = pd.to_datetime(df['date'].str.strip(), format='%d-%b-%Y')
+    quantity, price = parse_quantities(df['quantity']), parse_grouped_numbers(df['price'])
+    invalid = {'quantity': int((quantity.isna() & (df['quantity'].str.strip() != '')).sum()),
+               'price': int((np.isnan(price) & (df['price'].str.strip() != '')).sum())}
+    if any(invalid.values()):
+        warnings.warn(f"{os.path.basename(path)}: unparseable cells left missing: "
+                      + ', '.join(f'{count} {name}' for name, count in invalid.items() if count))
+    df['quantity'], df['price'] = quantity, price
+    for column in CATEGORY_COLUMNS:
+        df[column] = df[column].astype('category')
+    return df[list(HEADER_NAMES.values())]
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_bulk_deals(directory=BULK_DEALS_DIR, cache_dir=BULK_DEALS_CACHE_DIR, max_workers=None):
+    """All yearly bulk-deal files as one typed frame sorted by date.
+
+    Each source file is parsed once, in a process pool, and cached as a Parquet fragment named after the SHA-1
+    of its content, so a new or edited yearly file is the only one reparsed. The combined frame is cached too,
+    keyed by the hashes of all source files, so an unchanged reload is a single Parquet read. Symbol, security,
+    client, side and remarks are dictionary-encoded (categorical).
+    """
+    paths = sorted(glob.glob(os.path.join(directory, 'Bulk-Deals-*.csv')))
+    if not paths:
+        raise FileNotFoundError(f"No Bulk-Deals-*.csv files found in {directory}")
+    digests = [file_hash(path) for path in paths]
+
+    combined_path = None
+    if cache_dir is not None:
+        key = hashlib.sha1('|'.join(digests).encode()).hexdigest()
+        combined_path = os.path.join(cache_dir, f'combined-{key}.parquet')
+        if os.path.exists(combined_path):
+            return pd.read_parquet(combined_path)
+
+    fragments = {}
+    missing = []
+    for path, digest in zip(paths, digests):
+        cached = None if cache_dir is None else os.path.join(cache_dir, f'{digest}.parquet')
+        if cached is not None and os.path.exists(cached):
+            fragments[path] = pd.read_parquet(cached)
+        else:
+            missing.append((path, cached))
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            parsed = pool.map(parse_bulk_deal_file, [path for path, _ in missing])
+            for (path, cached), df in zip(missing, parsed):
+                fragments[path] = df
+                if cached is not None:
+                    _write_parquet(df, cached)
+
+    deals = combine_fragments([fragments[path] for path in paths])
+    if combined_path is not None:
+        for stale in glob.glob(os.path.join(cache_dir, 'combined-*.parquet')):
+            os.remove(stale)
+        _write_parquet(deals, combined_path)
+    return deals
+
+
+def _write_parquet(df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(f'{path}.tmp', index=False)
+    os.replace(f'{path}.tmp', path)
+
+
+def combine_fragments(frames):
+    """Concatenates typed frames keeping one shared dictionary per categorical column."""
+    frames = [df for df in frames if len(df)]
+    combined = {}
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            combined[column] = union_categoricals([df[column] for df in frames])
+        elif pd.api.types.is_extension_array_dtype(frames[0][column].dtype):
+            # The nullable Int64 quantity: NumPy would turn it into an object array
+            combined[column] = pd.concat([df[column] for df in frames], ignore_index=True)
+        else:
+            combined[column] = np.concatenate([df[column].to_numpy() for df in frames])
+    deals = pd.DataFrame(combined)
+    return deals.sort_values('date', kind='stable').reset_index(drop=True)
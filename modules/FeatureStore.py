@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from modules.FeatureEngine import PanelFeatureEngine
+from modules.PriceFeatures import VOLATILITY_WINDOWS
+from modules.PriceStore import LongTableStore
+
+
+class FeatureStore(LongTableStore):
+    """Derived features of the raw `prices` table, materialised in a separate `features` table.
+
+    Rows are never dropped during warm-up: a feature that is not defined yet is stored as NULL, and the `bars`
+    column (number of stored closes up to and including the row) makes the warm-up explicit, e.g.
+    `volatility_60d` is warm once `bars > 60`. Everything is recomputed from the local closes, so new windows
+    are added without a network refetch. Each symbol's features depend only on its own stored closes, so a
+    `rebuild()` and an `update()` of a subset of symbols give the same values.
+
+    The window set is the `windows` argument plus every `volatility_<w>d` column already in the table, so
+    windows added with `add_windows` stay computed by later stores and refreshes.
+    """
+
+    TABLE = 'features'
+
+    def __init__(self, price_store, windows=VOLATILITY_WINDOWS):
+        self.price_store = price_store
+        super().__init__(price_store.engine)
+        self.feature_engine = PanelFeatureEngine(tuple(windows) + self.stored_windows())
+
+    def _create_table(self):
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    date TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    bars INTEGER,
+                    PRIMARY KEY (date, symbol)
+                ) WITHOUT ROWID""")
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_symbol_date "
+                                 f"ON {self.TABLE} (symbol, date)")
+
+    @property
+    def windows(self):
+        return self.feature_engine.windows
+
+    def stored_windows(self):
+        """Volatility windows that have a column in the table."""
+        return tuple(int(c[len('volatility_'):-1]) for c in self.columns
+                     if c.startswith('volatility_') and c.endswith('d') and c[len('volatility_'):-1].isdigit())
+
+    @staticmethod
+    def warmup_length(name):
+        """Number of stored bars a feature needs before its first defined value, minus one."""
+        if name == 'log_return':
+            return 1
+        return int(name.split('_')[-1].rstrip('d'))
+
+    def rebuild(self, symbols=None):
+        symbols = self.price_store.symbols() if symbols is None else symbols
+        return self.update({symbol: None for symbol in symbols})
+
+    def update(self, since_by_symbol):
+        """Recomputes features from each symbol's `since` date onwards (None recomputes the full history)."""
+        groups = {}
+        for symbol, since in since_by_symbol.items():
+            groups.setdefault(None if since is None else self._date_key(since), []).append(symbol)
+        return sum(self._recompute(symbols, since, self.feature_engine) for since, symbols in groups.items())
+
+    def add_windows(self, windows):
+        """Adds volatility windows computed from the stored closes; existing feature columns are untouched."""
+        new_windows = [int(w) for w in windows if int(w) not in self.windows]
+        if new_windows:
+            engine = PanelFeatureEngine(new_windows)
+            self._recompute(self.price_store.symbols(), None, engine, columns=engine.feature_names[1:])
+            self.feature_engine = PanelFeatureEngine(self.windows + tuple(new_windows))
+        return new_windows
+
+    def warmup_mask(self, name, start=None, end=None, symbols=None):
+        """Date x symbol mask that is True where `name` is still in its warm-up period."""
+        bars = self.read_panel('bars', start, end, symbols)
+        return (bars <= self.warmup_length(name)) & bars.notna()
+
+    def _recompute(self, symbols, since, engine, columns=None):
+        context_start = None if since is None else self._context_start(symbols, since, max(engine.windows))
+        close = self.price_store.read_panel('close', start=context_start, symbols=symbols)
+        if close.empty:
+            return 0
+
+        values = close.to_numpy()
+        valid = ~np.isnan(values)
+        features = engine.compute(values)
+        prior_bars = self._bars_before(close.columns, context_start)
+        features['bars'] = np.cumsum(valid, axis=0) + prior_bars[None, :]
+
+        rows = engine.to_long(features, close.index, close.columns)
+        keep = valid.reshape(-1)
+        if since is not None:
+            keep &= (rows['date'] >= pd.Timestamp(since)).to_numpy()
+        rows = rows[keep]
+        if columns is not None:
+            rows = rows[['date', 'symbol'] + list(columns)]
+
+        self._ensure_columns(rows.columns)
+        with self.engine.begin() as conn:
+            if columns is None:
+                conn.exec_driver_sql(f"DELETE FROM {self.TABLE} WHERE symbol = ? AND date >= ?",
+                                     [(symbol, since or '') for symbol in close.columns])
+            return self._insert(conn, None, rows)
+
+    def _context_start(self, symbols, since, window):
+        """Earliest date that gives every symbol `window` stored bars of warm-up before `since`."""
+        starts = []
+        with self.engine.connect() as conn:
+            for symbol in symbols:
+                start = conn.exec_driver_sql(
+                    f"SELECT date FROM {self.price_store.TABLE} WHERE symbol = ? AND date < ? "
+                    f"ORDER BY date DESC LIMIT 1 OFFSET ?", (symbol, since, int(window))).scalar()
+                if start is None:
+                    return None
+                starts.append(start)
+        return min(starts) if starts else None
+
+    def _bars_before(self, symbols, date):
+        if date is None:
+            return np.zeros(len(symbols), dtype=np.int64)
+        with self.engine.connect() as conn:
+            bars = [conn.exec_driver_sql(f"SELECT bars FROM {self.TABLE} WHERE symbol = ? AND date < ? "
+                                         f"ORDER BY date DESC LIMIT 1", (symbol, self._date_key(date))).scalar()
+                    for symbol in symbols]
+        return np.array([b or 0 for b in bars], dtype=np.int64)
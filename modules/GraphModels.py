@@ -0,0 +1,86 @@
+import torch
+from torch_geometric.nn import GCNConv
+
+
+class GNN(torch.nn.Module):
+    """Two GCNConv layers with a ReLU in between (the SimpleGNN notebook model), one output per node."""
+
+    def __init__(self, input_dim, hidden_dim, output_dim):
+        super(GNN, self).__init__()
+        self.conv1 = GCNConv(input_dim, hidden_dim)
+        self.conv2 = GCNConv(hidden_dim, output_dim)
+
+    def forward(self, data):
+        x, edge_index = data.x, data.edge_index
+        x = self.conv1(x, edge_index)
+        x = torch.relu(x)
+        x = self.conv2(x, edge_index)
+        return x  # Final output (predicted values)
+
+
+class RelationalGraphConv(torch.nn.Module):
+    """Relational graph convolution over pre-normalised adjacencies: x W_self + sum_r A_r x W_r.
+
+    `adjacencies` is `RelationalGraph.to_torch()`, one sparse [N, N] matrix per relation. All relation weights are
+    applied in one matmul before propagation. `x` is [N, F] or batched [B, N, F]; a batch is propagated as a
+    single [N, B * out] sparse product.
+    """
+
+    def __init__(self, in_channels, out_channels, num_relations, bias=True):
+        super().__init__()
+        self.out_channels = out_channels
+        self.num_relations = num_relations
+        self.self_loop = torch.nn.Linear(in_channels, out_channels, bias=bias)
+        self.relation_weight = torch.nn.Linear(in_channels, out_channels * num_relations, bias=False)
+
+    def forward(self, x, adjacencies):
+        out = self.self_loop(x)
+        messages = self.relation_weight(x).split(self.out_channels, dim=-1)
+        for adjacency, message in zip(adjacencies, messages):
+            out = out + propagate(adjacency, message)
+        return out
+
+
+def propagate(adjacency, x):
+    """A @ x for [N, F] or [B, N, F] features."""
+    if x.dim() == 2:
+        return torch.sparse.mm(adjacency, x)
+    batch, nodes, features = x.shape
+    flat = x.permute(1, 0, 2).reshape(nodes, batch * features)
+    return torch.sparse.mm(adjacency, flat).reshape(nodes, batch, features).permute(1, 0, 2)
+
+
+class RelationalGNN(torch.nn.Module):
+    """Two relational convolutions with a ReLU in between, predicting one value per node and target."""
+
+    def __init__(self, input_dim, hidden_dim, output_dim, num_relations):
+        super().__init__()
+        self.conv1 = RelationalGraphConv(input_dim, hidden_dim, num_relations)
+        self.conv2 = RelationalGraphConv(hidden_dim, output_dim, num_relations)
+
+    def forward(self, x, adjacencies):
+        x = torch.relu(self.conv1(x, adjacencies))
+        return self.conv2(x, adjacencies)
+
+
+class PropagatedMLP(torch.nn.Module):
+    """Node-wise MLP over precomputed propagated features (see PropagatedFeatures), a SIGN-style head.
+
+    The graph is already folded into the inputs, so a step is a dense [N, F] pass whatever the number of edges.
+    `hidden_dim=None` gives the linear (SGC) head.
+    """
+
+    def __init__(self, input_dim, hidden_dim, output_dim, dropout=0.0):
+        super().__init__()
+        if hidden_dim is None:
+            self.layers = torch.nn.Linear(input_dim, output_dim)
+        else:
+            self.layers = torch.nn.Sequential(
+                torch.nn.Linear(input_dim, hidden_dim),
+                torch.nn.ReLU(),
+                torch.nn.Dropout(dropout),
+                torch.nn.Linear(hidden_dim, output_dim),
+            )
+
+    def forward(self, x):
+        return self.layers(x)
@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from modules.PriceIngestion import PRICE_COLUMNS, PriceIngestionEngine
+
+
+@dataclass
+class RefreshReport:
+    updated: int = 0
+    up_to_date: int = 0
+    appended_rows: int = 0
+    restated: list = field(default_factory=list)
+    backfilled: list = field(default_factory=list)
+    feature_since: dict = field(default_factory=dict)
+    runs: list = field(default_factory=list)
+
+    @property
+    def elapsed(self):
+        return sum(run.elapsed for run in self.runs)
+
+    def summary(self):
+        return (f"Incremental refresh: {self.updated} symbols updated (+{self.appended_rows} rows), "
+                f"{self.up_to_date} already up to date, {len(self.restated)} restated and refetched, "
+                f"{len(self.backfilled) - len(self.restated)} new symbols backfilled in {self.elapsed:.1f}s")
+
+
+class IncrementalRefresher:
+    """Delta refresh of a PriceStore: fetches only the missing tail of every symbol.
+
+    The tail is fetched from `overlap_days` business days before the last stored date. If the overlapping
+    closes differ from the stored ones (a split or dividend restated the adjusted history), the symbol is
+    refetched in full; otherwise only the new raw bars are appended. If a FeatureStore is given, only the
+    feature rows the new bars affect are recomputed afterwards, using the stored closes as warm-up.
+    """
+
+    def __init__(self, store, fetcher, start_date, feature_store=None, overlap_days=5, tolerance=1e-4,
+                 batch_size=100, max_workers=4, verbose=True):
+        self.store = store
+        self.fetcher = fetcher
+        self.start_date = start_date
+        self.feature_store = feature_store
+        self.overlap_days = overlap_days
+        self.tolerance = tolerance
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.verbose = verbose
+
+    def refresh(self, symbols, end=None):
+        symbols = list(dict.fromkeys(symbols))
+        last_dates = self.store.last_dates(symbols)
+        report = RefreshReport()
+
+        # Symbols sharing a last stored date share one fetch start, so each group is a single batched run
+        groups = {}
+        for symbol, last_date in last_dates.items():
+            start = (last_date - pd.offsets.BDay(self.overlap_days)).normalize()
+            groups.setdefault(start, []).append(symbol)
+
+        for start, group in sorted(groups.items()):
+            sink = lambda symbol, df: self._append_tail(symbol, df, last_dates[symbol], report)
+            report.runs.append(self._engine(sink).run(group, start.strftime('%Y-%m-%d'), end))
+
+        report.backfilled = report.restated + [s for s in symbols if s not in last_dates]
+        if report.backfilled:
+            sink = lambda symbol, df: self._store_full(symbol, df, report)
+            report.runs.append(self._engine(sink).run(report.backfilled, self.start_date, end))
+
+        if self.feature_store is not None and report.feature_since:
+            self.feature_store.update(report.feature_since)
+
+        if self.verbose:
+            print(report.summary())
+        return report
+
+    def _engine(self, sink):
+        return PriceIngestionEngine(self.fetcher, sink, batch_size=self.batch_size, max_workers=self.max_workers,
+                                    verbose=self.verbose)
+
+    def _append_tail(self, symbol, fetched, last_date, report):
+        context = self.store.read_tail(symbol, self.overlap_days + 1)
+        overlap = fetched.merge(context[['date', 'close']], on='date', suffixes=('', '_stored'))
+        if len(overlap) and ((overlap['close'] / overlap['close_stored'] - 1).abs() > self.tolerance).any():
+            report.restated.append(symbol)
+            return 0
+
+        new_rows = fetched.loc[fetched['date'] > last_date, PRICE_COLUMNS]
+        if new_rows.empty:
+            report.up_to_date += 1
+            return 0
+        rows = self.store.append(symbol, new_rows)
+        report.updated += 1
+        report.appended_rows += rows
+        report.feature_since[symbol] = new_rows['date'].min()
+        return rows
+
+    def _store_full(self, symbol, df, report):
+        report.feature_since[symbol] = None
+        return self.store.write(symbol, df)
@@ -0,0 +1,126 @@
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def build_panel_cache(price_store, path, fields=PANEL_FIELDS, feature_store=None, features=(), start=None, end=None,
+                      dtype=np.float32):
+    """Materialises a [date, symbol, field] panel as `<path>.npy` plus a `<path>.json` index of dates/symbols/fields.
+
+    Price fields come from `price_store` and derived features from `feature_store`; missing bars stay NaN.
+    """
+    panels = {}
+    if fields:
+        panels.update(_split_fields(price_store.read_panel(list(fields), start, end), fields))
+    if features:
+        panels.update(_split_fields(feature_store.read_panel(list(features), start, end), features))
+    names = list(fields) + list(features)
+
+    dates = pd.DatetimeIndex(sorted(set().union(*(p.index for p in panels.values()))))
+    symbols = sorted(set().union(*(p.columns for p in panels.values())))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    array = np.lib.format.open_memmap(f'{path}.npy.tmp', mode='w+', dtype=dtype,
+                                      shape=(len(dates), len(symbols), len(names)))
+    for k, name in enumerate(names):
+        array[:, :, k] = panels[name].reindex(index=dates, columns=symbols).to_numpy(dtype=dtype)
+    array.flush()
+    del array
+    return publish_panel_cache(path, dates, symbols, names, dtype)
+
+
+def publish_panel_cache(path, dates, symbols, fields, dtype):
+    """Swaps a finished `<path>.npy.tmp` in and writes its `<path>.json` index.
+
+    The array is replaced first and the index last, so a reader never sees a new index over an old array; a
+    reader that opens the old index just before the new array lands fails the shape check in PanelCache.
+    """
+    index = {
+        'dates': [d.strftime('%Y-%m-%d') for d in pd.DatetimeIndex(dates)],
+        'symbols': list(symbols),
+        'fields': list(fields),
+        'dtype': np.dtype(dtype).name,
+    }
+    with open(f'{path}.json.tmp', 'w') as f:
+        json.dump(index, f)
+    os.replace(f'{path}.npy.tmp', f'{path}.npy')
+    os.replace(f'{path}.json.tmp', f'{path}.json')
+    return PanelCache(path)
+
+
+def _split_fields(panel, names):
+    if len(names) == 1:
+        return {names[0]: panel}
+    return {name: panel[name] for name in names}
+
+
+class PanelCache:
+    """Read-only memory-mapped view of a panel built by `build_panel_cache`.
+
+    Opening a cache maps the file without reading it, and every process that opens the same file shares the
+    same page-cache pages. Accessors return views of the mapping rather than copies.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(f'{path}.json') as f:
+            index = json.load(f)
+        self.symbols = index['symbols']
+        self.fields = index['fields']
+        self._date_strings = index['dates']
+        self._dates = None
+        self.array = np.load(f'{path}.npy', mmap_mode='r')
+        expected = (len(self._date_strings), len(self.symbols), len(self.fields))
+        if self.array.shape != expected:
+            raise ValueError(f"{path}.npy has shape {self.array.shape} but its index describes {expected}; "
+                             f"the cache was rebuilt while being opened, open it again")
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.field_index = {name: k for k, name in enumerate(self.fields)}
+
+    @property
+    def dates(self):
+        if self._dates is None:
+            self._dates = pd.DatetimeIndex(self._date_strings)
+        return self._dates
+
+    @property
+    def shape(self):
+        return self.array.shape
+
+    def field(self, name):
+        """[date, symbol] view of one field."""
+        return self.array[:, :, self.field_index[name]]
+
+    def date_slice(self, start=None, end=None):
+        """Positional slice of the dates in [start, end], for slicing `array` without copying."""
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), side='left'))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side='right'))
+        return slice(lo, hi)
+
+    def window(self, start=None, end=None, fields=None):
+        array = self.array[self.date_slice(start, end)]
+        if fields is None:
+            return array
+        ks = [self.field_index[name] for name in fields]
+        # Contiguous field ranges stay views; an arbitrary selection needs fancy indexing (a copy)
+        if ks == list(range(ks[0], ks[0] + len(ks))):
+            return array[:, :, ks[0]:ks[0] + len(ks)]
+        return array[:, :, ks]
+
+    def to_frame(self, name, start=None, end=None):
+        rows = self.date_slice(start, end)
+        return pd.DataFrame(self.field(name)[rows], index=self.dates[rows], columns=self.symbols)
+
+    def as_tensor(self, start=None, end=None, fields=None):
+        """Zero-copy torch tensor over the mapped pages (read-only: do not write to it in place)."""
+        import torch
+
+        with warnings.catch_warnings():
+            # torch warns that the mapped array is not writable; sharing the read-only pages is the point here
+            warnings.simplefilter('ignore', UserWarning)
+            return torch.from_numpy(self.window(start, end, fields))
@@ -0,0 +1,14 @@
+import numpy as np
+import pandas as pd
+
+VOLATILITY_WINDOWS = (5, 30, 60)
+
+
+def add_return_features(df, windows=VOLATILITY_WINDOWS):
+    """Adds `log_return` and one `volatility_<w>d` rolling std of log returns per window."""
+    df = df.copy()
+    df['log_return'] = np.log(df['close'] / df['close'].shift(1))
+    for w in windows:
+        df[f'volatility_{w}d'] = df['log_return'].rolling(window=w).std()
+    return df
+
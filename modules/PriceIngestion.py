@@ -0,0 +1,287 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def clean_price_frame(df):
+    """Flattens a yfinance-style frame to lower-case `date, open, high, low, close, volume` rows."""
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [col[0] for col in df.columns]
+    if 'date' not in [str(c).lower() for c in df.columns]:
+        df = df.reset_index()
+    df.columns = [str(c).lower() for c in df.columns]
+    df = df[[c for c in PRICE_COLUMNS if c in df.columns]]
+    df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
+    # Multi-ticker downloads are aligned on the union of dates, so symbols listed later carry empty rows
+    return df.dropna(subset=['close']).sort_values('date').reset_index(drop=True)
+
+
+class PriceFetcher:
+    """Batched price source used by PriceIngestionEngine.
+
+    `fetch` returns {ticker: DataFrame[PRICE_COLUMNS]} for the tickers of the batch that had data and
+    {ticker: Exception} for tickers the source reported as failed (rate limits, timeouts); tickers missing from
+    the result are recorded as empty. Neither is complete, so both are fetched again on the next run.
+    """
+
+    def fetch(self, tickers, start, end=None):
+        raise NotImplementedError
+
+
+def _yfinance_download(tickers, start, end, interval, auto_adjust):
+    """One yf.download in a worker process: (frame, {ticker: error message})."""
+    import yfinance as yf
+
+    raw = yf.download(tickers, start=start, end=end, interval=interval, auto_adjust=auto_adjust,
+                      group_by='ticker', progress=False, threads=True)
+    # yfinance reports per-ticker failures (including rate limits) here instead of raising
+    return raw, dict(getattr(yf.shared, '_ERRORS', {}) or {})
+
+
+class YFinanceFetcher(PriceFetcher):
+    """yfinance source whose batches really run concurrently.
+
+    yf.download keeps its results and errors in module-level state, so two downloads in one process would mix
+    them up. Each batch is downloaded in a worker process of the fetcher's own pool (`processes`, matching the
+    engine's `max_workers`), so the engine's batches overlap; the tickers inside a batch are still downloaded
+    in parallel by yfinance's own threads. `close()` shuts the pool down.
+    """
+
+    def __init__(self, interval="1d", auto_adjust=True, processes=4):
+        self.interval = interval
+        self.auto_adjust = auto_adjust
+        self.processes = processes
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn rather than fork: the engine calls fetch from its own threads
+                self._pool = ProcessPoolExecutor(self.processes, mp_context=get_context('spawn'))
+            return self._pool
+
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+    def fetch(self, tickers, start, end=None):
+        tickers = list(tickers)
+        raw, errors = self._executor().submit(_yfinance_download, tickers, start, end, self.interval,
+                                              self.auto_adjust).result()
+        frames = {ticker: RuntimeError(errors[ticker]) for ticker in tickers if ticker in errors}
+        if raw is None or raw.empty:
+            return frames
+        for ticker in tickers:
+            if ticker in frames:
+                continue
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[ticker]
+            else:
+                df = raw
+            df = clean_price_frame(df)
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+
+class LocalFileFetcher(PriceFetcher):
+    """Stand-in source reading one `<ticker>.csv` file per symbol from a directory (for offline runs and tests)."""
+
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency                  # simulated per-batch network latency in seconds
+
+    def fetch(self, tickers, start, end=None):
+        if self.latency:
+            time.sleep(self.latency)
+        frames = {}
+        for ticker in tickers:
+            path = os.path.join(self.directory, f"{ticker}.csv")
+            if not os.path.exists(path):
+                continue
+            df = clean_price_frame(pd.read_csv(path))
+            mask = df['date'] >= pd.Timestamp(start)
+            if end is not None:
+                mask &= df['date'] < pd.Timestamp(end)
+            df = df[mask].reset_index(drop=True)
+            if not df.empty:
+                frames[ticker] = df
+        return frames
+
+
+class IngestionManifest:
+    """Persistent per-ticker checkpoint so that a rerun only fetches what is missing."""
+
+    # 'empty' is not complete: yfinance returns no rows for throttled tickers as well as for dead ones
+    COMPLETE = ('done',)
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def pending(self, tickers, start, end=None):
+        start = str(start)[:10]
+        end = None if end is None else str(end)[:10]
+        return [t for t in tickers
+                if self.entries.get(t, {}).get('status') not in self.COMPLETE
+                or self.entries[t].get('start') != start
+                or self.entries[t].get('end') != end]
+
+    def mark(self, ticker, status, start, rows=0, last_date=None, error=None, end=None):
+        with self._lock:
+            self.entries[ticker] = {
+                'status': status,
+                'start': str(start)[:10],
+                'end': None if end is None else str(end)[:10],
+                'rows': int(rows),
+                'last_date': None if last_date is None else str(last_date)[:10],
+                'error': error,
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+            }
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp_path, self.path)        # atomic, a crash never leaves a half-written manifest
+
+    def reset(self, tickers=None):
+        with self._lock:
+            if tickers is None:
+                self.entries = {}
+            else:
+                for ticker in tickers:
+                    self.entries.pop(ticker, None)
+
+
+@dataclass
+class IngestionReport:
+    requested: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    empty: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    batch_latencies: list = field(default_factory=list)
+
+    @property
+    def processed(self):
+        return self.succeeded + self.empty + self.failed
+
+    @property
+    def tickers_per_minute(self):
+        return 60.0 * self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        lines = [f"Tickers: {self.requested} requested, {self.skipped} already complete, "
+                 f"{self.succeeded} stored, {self.empty} empty, {self.failed} failed",
+                 f"Elapsed: {self.elapsed:.1f}s | Throughput: {self.tickers_per_minute:.1f} tickers/minute"]
+        if self.batch_latencies:
+            latencies = np.asarray(self.batch_latencies)
+            lines.append(f"Batch latency over {len(latencies)} batches: mean {latencies.mean():.2f}s, "
+                         f"p50 {np.percentile(latencies, 50):.2f}s, p95 {np.percentile(latencies, 95):.2f}s, "
+                         f"max {latencies.max():.2f}s")
+        return "\n".join(lines)
+
+
+class PriceIngestionEngine:
+    """Downloads tickers in multi-ticker batches over a bounded worker pool.
+
+    `sink(ticker, df)` persists one cleaned frame and returns the number of stored rows. It is always called
+    from the calling thread, so a single database connection can be used without locking.
+    """
+
+    def __init__(self, fetcher, sink, manifest=None, batch_size=100, max_workers=4, verbose=True):
+        self.fetcher = fetcher
+        self.sink = sink
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.verbose = verbose
+
+    def run(self, tickers, start, end=None):
+        tickers = list(dict.fromkeys(tickers))
+        pending = self.manifest.pending(tickers, start, end) if self.manifest is not None else tickers
+        report = IngestionReport(requested=len(tickers), skipped=len(tickers) - len(pending))
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+
+        run_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_batch, batch, start, end): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    frames, latency = future.result()
+                except Exception as e:
+                    for ticker in batch:
+                        self._mark(ticker, 'failed', start, end, error=str(e))
+                    report.failed += len(batch)
+                    self._log(f"Error in batch starting {batch[0]}: {e}")
+                    self._save_manifest()
+                    continue
+
+                report.batch_latencies.append(latency)
+                for ticker in batch:
+                    df = frames.get(ticker)
+                    if isinstance(df, Exception):
+                        self._mark(ticker, 'failed', start, end, error=str(df))
+                        report.failed += 1
+                        continue
+                    if df is None or df.empty:
+                        self._mark(ticker, 'empty', start, end)
+                        report.empty += 1
+                        continue
+                    try:
+                        rows = self.sink(ticker, df)
+                        self._mark(ticker, 'done', start, end, rows=len(df) if rows is None else rows,
+                                   last_date=df['date'].iloc[-1])
+                        report.succeeded += 1
+                    except Exception as e:
+                        self._mark(ticker, 'failed', start, end, error=str(e))
+                        report.failed += 1
+                        self._log(f"Error {ticker}: {e}")
+                self._save_manifest()
+                self._log(f"Processed {report.processed + report.skipped}/{report.requested} "
+                          f"(batch of {len(batch)} in {latency:.2f}s)")
+
+        report.elapsed = time.perf_counter() - run_start
+        return report
+
+    def _fetch_batch(self, batch, start, end):
+        batch_start = time.perf_counter()
+        frames = self.fetcher.fetch(batch, start, end)
+        return frames, time.perf_counter() - batch_start
+
+    def _mark(self, ticker, status, start, end, **kwargs):
+        if self.manifest is not None:
+            self.manifest.mark(ticker, status, start, end=end, **kwargs)
+
+    def _save_manifest(self):
+        if self.manifest is not None:
+            self.manifest.save()
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
@@ -0,0 +1,191 @@
+import os
+
+import pandas as pd
+import sqlalchemy
+
+from modules.PriceIngestion import PRICE_COLUMNS
+
+
+class LongTableStore:
+    """Reads and upserts of a long-format SQLite table keyed by (date, symbol), shared by PriceStore and
+    FeatureStore. Subclasses set TABLE and create it in `_create_table`."""
+
+    TABLE = None
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._columns = None
+        self._create_table()
+
+    def _create_table(self):
+        raise NotImplementedError
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            with self.engine.connect() as conn:
+                rows = conn.exec_driver_sql(f"PRAGMA table_info({self.TABLE})").fetchall()
+            self._columns = [row[1] for row in rows]
+        return self._columns
+
+    def _ensure_columns(self, columns):
+        missing = [c for c in columns if c not in self.columns and c != 'symbol']
+        if missing:
+            with self.engine.begin() as conn:
+                for column in missing:
+                    conn.exec_driver_sql(f'ALTER TABLE {self.TABLE} ADD COLUMN "{column}" REAL')
+            self._columns = None
+
+    def symbols(self):
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"SELECT DISTINCT symbol FROM {self.TABLE} ORDER BY symbol").fetchall()
+        return [row[0] for row in rows]
+
+    def last_dates(self, symbols=None):
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"SELECT symbol, MAX(date) FROM {self.TABLE} GROUP BY symbol").fetchall()
+        last_dates = {symbol: pd.Timestamp(date) for symbol, date in rows}
+        if symbols is not None:
+            last_dates = {s: last_dates[s] for s in symbols if s in last_dates}
+        return last_dates
+
+    def last_date(self):
+        """Latest stored date of any symbol (one probe of the date-clustered primary key)."""
+        with self.engine.connect() as conn:
+            date = conn.exec_driver_sql(f"SELECT MAX(date) FROM {self.TABLE}").scalar()
+        return None if date is None else pd.Timestamp(date)
+
+    def read(self, symbol, start=None, end=None):
+        where, params = self._date_filter(start, end, ['symbol = ?'], [symbol])
+        return self._query(f"SELECT * FROM {self.TABLE} WHERE {where} ORDER BY date", params).drop(columns='symbol')
+
+    def read_tail(self, symbol, rows):
+        df = self._query(f"SELECT * FROM {self.TABLE} WHERE symbol = ? ORDER BY date DESC LIMIT {int(rows)}",
+                         (symbol,))
+        return df.drop(columns='symbol').iloc[::-1].reset_index(drop=True)
+
+    def read_cross_section(self, date, fields=None):
+        """All symbols on one date, indexed by symbol."""
+        columns = '*' if fields is None else ', '.join(['symbol'] + list(fields))
+        df = self._query(f"SELECT {columns} FROM {self.TABLE} WHERE date = ?", (self._date_key(date),))
+        return df.drop(columns='date', errors='ignore').set_index('symbol')
+
+    def read_panel(self, field='close', start=None, end=None, symbols=None):
+        """Dense date x symbol panel of one field (or a list of fields, giving (field, symbol) columns)."""
+        fields = [field] if isinstance(field, str) else list(field)
+        where, params = self._date_filter(start, end, [], [])
+        df = self._query(f"SELECT date, symbol, {', '.join(fields)} FROM {self.TABLE} WHERE {where}", params)
+        panel = df.pivot(index='date', columns='symbol', values=fields if len(fields) > 1 else fields[0])
+        if symbols is not None:
+            panel = panel.reindex(columns=symbols, level=1 if len(fields) > 1 else None)
+        return panel.sort_index()
+
+    def _insert(self, conn, symbol, df):
+        """Upserts rows of one symbol (or of many, if `symbol` is None and `df` has a symbol column).
+
+        Only the columns present in `df` are written, so other stored columns of existing rows are preserved.
+        """
+        if df.empty:
+            return 0
+        columns = [c for c in df.columns if c not in ('date', 'symbol')]
+        symbols = df['symbol'].tolist() if symbol is None else [symbol] * len(df)
+        values = [df['date'].map(self._date_key).tolist(), symbols] + [df[c].tolist() for c in columns]
+        names = ', '.join(['date', 'symbol'] + [f'"{c}"' for c in columns])
+        placeholders = ', '.join(['?'] * (len(columns) + 2))
+        updates = ', '.join(f'"{c}" = excluded."{c}"' for c in columns) or 'symbol = excluded.symbol'
+        conn.exec_driver_sql(f"INSERT INTO {self.TABLE} ({names}) VALUES ({placeholders}) "
+                             f"ON CONFLICT (date, symbol) DO UPDATE SET {updates}", list(zip(*values)))
+        return len(df)
+
+    def _query(self, sql, params=()):
+        with self.engine.connect() as conn:
+            result = conn.exec_driver_sql(sql, tuple(params))
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def _date_filter(self, start, end, clauses, params):
+        if start is not None:
+            clauses.append('date >= ?')
+            params.append(self._date_key(start))
+        if end is not None:
+            clauses.append('date <= ?')
+            params.append(self._date_key(end))
+        return (' AND '.join(clauses) or '1 = 1'), params
+
+    @staticmethod
+    def _date_key(date):
+        return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+
+class PriceStore(LongTableStore):
+    """Long-format SQLite price store: one `prices` row per (date, symbol) holding the raw OHLCV bar.
+
+    The table is clustered on (date, symbol), so a cross-section or a date-range panel is a single indexed range
+    read; a secondary (symbol, date) index serves per-symbol tails for the incremental refresh.
+    """
+
+    TABLE = 'prices'
+    RESERVED_TABLES = {'stock_info', 'prices', 'features'}
+
+    def _create_table(self):
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"""
+                CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                    date TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (date, symbol)
+                ) WITHOUT ROWID""")
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_symbol_date "
+                                 f"ON {self.TABLE} (symbol, date)")
+
+    def write(self, symbol, df):
+        """Replaces all stored rows of `symbol`."""
+        self._ensure_columns(df.columns)
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"DELETE FROM {self.TABLE} WHERE symbol = ?", (symbol,))
+            return self._insert(conn, symbol, df)
+
+    def append(self, symbol, df):
+        """Appends rows, replacing any stored rows on or after the first appended date."""
+        if df.empty:
+            return 0
+        self._ensure_columns(df.columns)
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(f"DELETE FROM {self.TABLE} WHERE symbol = ? AND date >= ?",
+                                 (symbol, self._date_key(df['date'].min())))
+            return self._insert(conn, symbol, df)
+
+    def migrate_ticker_tables(self, drop=False):
+        """Copies the OHLCV of the legacy one-table-per-ticker layout (e.g. "RELIANCE.NS") into `prices`.
+
+        The legacy tables lost their first 60 rows to `dropna`; a full refetch of those symbols restores them.
+        """
+        legacy = [name for name in sqlalchemy.inspect(self.engine).get_table_names()
+                  if name not in self.RESERVED_TABLES]
+        for table in legacy:
+            df = pd.read_sql(f'SELECT * FROM "{table}"', self.engine, parse_dates=['date'])
+            self.write(table, df[[c for c in PRICE_COLUMNS if c in df.columns]])
+            if drop:
+                with self.engine.begin() as conn:
+                    conn.exec_driver_sql(f'DROP TABLE "{table}"')
+        return legacy
+
+    def export_parquet(self, directory):
+        """Writes the store as a Parquet dataset partitioned by year (`<directory>/year=YYYY/part-0.parquet`)."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with self.engine.connect() as conn:
+            years = [row[0] for row in conn.exec_driver_sql(
+                f"SELECT DISTINCT substr(date, 1, 4) FROM {self.TABLE} ORDER BY 1").fetchall()]
+        for year in years:
+            df = self._query(f"SELECT * FROM {self.TABLE} WHERE date >= ? AND date < ? ORDER BY date, symbol",
+                             (f'{year}-01-01', f'{int(year) + 1}-01-01'))
+            df['symbol'] = df['symbol'].astype('category')
+            os.makedirs(os.path.join(directory, f'year={year}'), exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                           os.path.join(directory, f'year={year}', 'part-0.parquet'))
+        return years
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from modules.PanelCache import PanelCache, publish_panel_cache
+
+
+def propagated_field_names(fields, relations, hops):
+    """Hop 0 keeps the field name; hop k of relation r is '<r>_hop<k>_<field>'."""
+    names = list(fields)
+    for relation in relations:
+        for k in range(1, hops + 1):
+            names += [f'{relation}_hop{k}_{field}' for field in fields]
+    return names
+
+
+def build_propagated_cache(panel, graph, path, fields=None, hops=2, node_ids=None, block=64, dtype=np.float32):
+    """Precomputes SIGN-style features [X, A_r X, A_r^2 X, ...] for every snapshot of `panel` into `<path>.npy`.
+
+    `panel` is a PanelCache and `graph` a RelationalGraph; its normalised adjacencies are applied `hops` times per
+    relation, `block` snapshots at a time as one sparse [N, N] x [N, block * F] product per hop. `node_ids` maps
+    the panel's symbols to graph node ids (e.g. `symbol_master.map_column(panel.symbols, 'yahoo')`); it defaults
+    to the identity. Missing values (warm-up, unlisted days) propagate as 0 and stay NaN at hop 0.
+
+    The result is a PanelCache ([date, symbol, field] memmap plus JSON index), so models read it like the raw
+    panel and training no longer touches the graph: epoch time is independent of the number of edges.
+    """
+    fields = list(panel.fields if fields is None else fields)
+    ks = [panel.field_index[name] for name in fields]
+    T, N, F = len(panel.dates), len(panel.symbols), len(fields)
+    matrices = [_restrict(graph.normalised[r], node_ids, N) for r in graph.relations]
+    names = propagated_field_names(fields, graph.relations, hops)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    out = np.lib.format.open_memmap(f'{path}.npy.tmp', mode='w+', dtype=dtype, shape=(T, N, len(names)))
+    for lo in range(0, T, block):
+        hi = min(lo + block, T)
+        x = np.asarray(panel.array[lo:hi][:, :, ks], dtype=np.float64)
+        out[lo:hi, :, :F] = x
+        # [block, N, F] -> [N, block * F], so each hop is one sparse product for the whole block
+        flat = np.nan_to_num(x).transpose(1, 0, 2).reshape(N, -1)
+        for j, h in enumerate(_propagate(flat, matrices, hops), start=1):
+            out[lo:hi, :, j * F:(j + 1) * F] = h.reshape(N, hi - lo, F).transpose(1, 0, 2)
+    out.flush()
+    del out
+    return publish_panel_cache(path, panel.dates, panel.symbols, names, dtype)
+
+
+def _propagate(flat, matrices, hops):
+    """A_r^k @ flat for each relation r and hop k = 1..hops, in `propagated_field_names` order."""
+    for matrix in matrices:
+        h = flat
+        for _ in range(hops):
+            h = matrix @ h
+            yield h
+
+
+class PropagatedCrossSection:
+    """Snapshot source giving the propagated features of one date, computed from the raw stores.
+
+    Values and names match `build_propagated_cache` (with `hops` and `node_ids` as given there), so a model
+    trained on the cache, e.g. PropagatedMLP, is scored on the latest day by SignalScorer with this in place of
+    the stores; the whole cross-section is read once per call because every hop mixes in the neighbours' rows.
+    `symbols` are the panel's symbols in cache order. Symbols without a row on the date are left out, like in a
+    store's cross-section.
+
+        source = PropagatedCrossSection([price_store, feature_store], graph, panel.symbols, fields, hops=2)
+        scorer = SignalScorer(model, panel.symbols, source.columns)
+        signals = scorer.score_latest(source)
+    """
+
+    def __init__(self, stores, graph, symbols, fields, hops=2, node_ids=None):
+        self.stores = stores if isinstance(stores, (list, tuple)) else [stores]
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.hops = hops
+        self.matrices = [_restrict(graph.normalised[r], node_ids, len(self.symbols)) for r in graph.relations]
+        self.columns = propagated_field_names(self.fields, graph.relations, hops)
+
+    def last_date(self):
+        return self.stores[0].last_date()
+
+    def read_cross_section(self, date, fields=None):
+        """Propagated features on `date`, indexed by symbol."""
+        parts = []
+        for store in self.stores:
+            names = [f for f in self.fields if f in store.columns and f not in ('date', 'symbol')]
+            if names:
+                parts.append(store.read_cross_section(date, names))
+        raw = pd.concat(parts, axis=1).reindex(index=self.symbols, columns=self.fields).to_numpy(dtype=np.float64)
+        hops = list(_propagate(np.nan_to_num(raw), self.matrices, self.hops))
+        frame = pd.DataFrame(np.hstack([raw] + hops), index=pd.Index(self.symbols, name='symbol'),
+                             columns=self.columns)
+        frame = frame[~np.isnan(raw).all(axis=1)]
+        return frame if fields is None else frame[list(fields)]
+
+
+def _restrict(matrix, node_ids, num_symbols):
+    """Adjacency between the panel's symbols, in panel order (symbols without a node get no edges)."""
+    if node_ids is None:
+        return matrix.tocsr()
+    node_ids = np.asarray(node_ids)
+    rows = np.flatnonzero(node_ids >= 0)
+    selector = sp.csr_matrix((np.ones(len(rows)), (rows, node_ids[rows])), shape=(num_symbols, matrix.shape[0]))
+    return (selector @ matrix @ selector.T).tocsr()
+
+
+def to_tabular(cache, targets=None, start=None, end=None, fields=None):
+    """Long (date, symbol) frame of propagated features for tree models (Random Forest / XGBoost / LightGBM).
+
+    `targets` is an optional {name: date x symbol DataFrame} (e.g. 5/10/30/60-day forward returns) joined as
+    columns; rows without any observed target are dropped.
+    """
+    rows = cache.date_slice(start, end)
+    fields = cache.fields if fields is None else list(fields)
+    values = cache.window(start, end, fields)
+    dates = cache.dates[rows]
+    frame = pd.DataFrame(values.reshape(-1, len(fields)), columns=fields)
+    frame.insert(0, 'symbol', np.tile(np.asarray(cache.symbols, dtype=object), len(dates)))
+    frame.insert(0, 'date', np.repeat(dates, len(cache.symbols)))
+    if targets:
+        for name, target in targets.items():
+            frame[name] = target.reindex(index=dates, columns=cache.symbols).to_numpy().reshape(-1)
+        frame = frame.dropna(subset=list(targets), how='all').reset_index(drop=True)
+    return frame
@@ -0,0 +1,231 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+RELATIONS = ('sector', 'group', 'value_chain', 'bulk_deal', 'correlation')
+
+
+class RelationalGraphBuilder:
+    """Collects typed, weighted edges between `num_nodes` symbol-master nodes, one relation at a time.
+
+    Sources: `add_categories` for same-label cliques (sector from `stock_info.industry`, group / parent holdings),
+    `add_edges` for edge lists (value-chain links, correlation edges) and `add_adjacency` for sparse matrices
+    (`BulkDealGraphBuilder.co_trading`). `build` deduplicates and normalises everything once.
+    """
+
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        self._edges = {}
+
+    def add_edges(self, relation, source, target, weight=None, symmetric=True):
+        source = np.asarray(source, dtype=np.int64)
+        target = np.asarray(target, dtype=np.int64)
+        weight = np.ones(len(source)) if weight is None else np.asarray(weight, dtype=np.float64)
+        keep = (source >= 0) & (target >= 0) & (source != target)
+        source, target, weight = source[keep], target[keep], weight[keep]
+        if symmetric:
+            source, target, weight = np.r_[source, target], np.r_[target, source], np.r_[weight, weight]
+        self._edges.setdefault(relation, []).append((source, target, weight))
+
+    def add_adjacency(self, relation, matrix, symmetric=True):
+        coo = sp.coo_matrix(matrix)
+        self.add_edges(relation, coo.row, coo.col, coo.data, symmetric)
+
+    def add_categories(self, relation, labels, weight=1.0):
+        """Connects every pair of nodes sharing a label; `labels` is indexed by node id, missing labels are skipped."""
+        labels = pd.Series(np.asarray(labels, dtype=object)).replace('', np.nan)
+        codes, _ = pd.factorize(labels)
+        nodes = np.flatnonzero(codes >= 0)
+        order = nodes[np.argsort(codes[nodes], kind='stable')]
+        groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1)
+        pairs = [np.array(np.meshgrid(g, g)).reshape(2, -1) for g in groups if len(g) > 1]
+        if pairs:
+            pairs = np.hstack(pairs)
+            self.add_edges(relation, pairs[0], pairs[1], np.full(pairs.shape[1], weight), symmetric=False)
+
+    def build(self, reduce='max', self_loops=True):
+        """RelationalGraph with duplicate edges merged by `reduce` ('max' or 'sum')."""
+        adjacency = {}
+        # Relation ids (edge_type) follow RELATIONS whatever order the edges were added in
+        relations = [r for r in RELATIONS if r in self._edges] + [r for r in self._edges if r not in RELATIONS]
+        for relation in relations:
+            source, target, weight = (np.concatenate(column) for column in zip(*self._edges[relation]))
+            adjacency[relation] = _deduplicate(source, target, weight, self.num_nodes, reduce)
+        return RelationalGraph(adjacency, self_loops=self_loops)
+
+
+def build_market_graph(symbol_master, symbols=None, as_of=None, deals=None, value_chains=None, returns=None,
+                       holdings=None, holdings_id='permid', deal_window='365D', min_shared_clients=1,
+                       correlation_window=60, top_k=10, self_loops=True):
+    """RelationalGraph of the recorded relations between symbol-master securities, as known on `as_of`.
+
+      'sector'       same `sector` in the symbol master (the Sector column of the Eikon listing).
+      'group'        parent / subsidiary links of `holdings`, a frame of `parent` and `child` identifiers (of
+                     `holdings_id`, PermIDs by default), weighted by the optional `stake` percentage (as a 0..1
+                     fraction, 1 when missing) and filtered by an optional `as_of` column. The repository ships no
+                     holdings data: load it from an ownership export (e.g. Eikon's parent / subsidiary screen).
+      'value_chain'  supplier / customer links of `load_value_chains(...)` exported by `as_of`, weighted by the
+                     confidence score (as a 0..1 fraction).
+      'bulk_deal'    stocks bulk-traded by the same clients in the `deal_window` up to `as_of` (`load_bulk_deals()`),
+                     weighted by the number of shared clients.
+      'correlation'  each stock's `top_k` strongest return correlations over the last `correlation_window` rows of
+                     `returns` up to `as_of` (date x yfinance symbol, e.g. `feature_store.read_panel('log_return')`).
+
+    Sources left as None are skipped; `as_of=None` takes the end of each source. Nodes are symbol-master node ids,
+    or the positions of `symbols` (yfinance tickers, e.g. `PanelCache.symbols`) when given, so the graph lines up
+    with a panel for WalkForwardEngine, SignalScorer and build_propagated_cache.
+    """
+    from modules.BulkDealGraph import BulkDealGraphBuilder
+    from modules.CorrelationEdges import RollingCorrelation
+
+    as_of = None if as_of is None else pd.Timestamp(as_of)
+    builder = RelationalGraphBuilder(len(symbol_master))
+    builder.add_categories('sector', symbol_master.identifiers('sector'))
+
+    if holdings is not None:
+        if as_of is not None and 'as_of' in holdings:
+            holdings = holdings[pd.to_datetime(holdings['as_of']) <= as_of]
+        parents, children = (symbol_master.map_column(holdings[end].astype(str), holdings_id)
+                             for end in ('parent', 'child'))
+        weight = (np.nan_to_num(pd.to_numeric(holdings['stake'], errors='coerce').to_numpy() / 100, nan=1.0)
+                  if 'stake' in holdings else None)
+        builder.add_edges('group', parents, children, weight)
+
+    if value_chains is not None:
+        if as_of is not None:
+            value_chains = value_chains[value_chains['as_of'] <= as_of]
+        sources, targets = (value_chains[f'{end}_node'].to_numpy() if f'{end}_node' in value_chains
+                            else symbol_master.map_column(value_chains[end].astype(str), 'permid')
+                            for end in ('source', 'target'))
+        weight = np.nan_to_num(value_chains['weight'].to_numpy(dtype=np.float64) / 100, nan=1.0)
+        builder.add_edges('value_chain', sources, targets, weight)
+
+    if deals is not None and len(deals):
+        deal_graph = BulkDealGraphBuilder(deals, node_index=symbol_master)
+        end = (pd.Timestamp(deal_graph.dates[-1]) if as_of is None else as_of).normalize() + pd.Timedelta(days=1)
+        builder.add_adjacency('bulk_deal', deal_graph.co_trading(end - pd.Timedelta(deal_window), end,
+                                                                 min_shared_clients=min_shared_clients))
+
+    if returns is not None:
+        window = returns if as_of is None else returns[returns.index <= as_of]
+        window = window.iloc[-correlation_window:]
+        if len(window):
+            nodes = symbol_master.map_column(window.columns, 'yahoo')
+            engine = RollingCorrelation(window.shape[1], window=len(window), min_periods=len(window) // 2)
+            for row in window.to_numpy(dtype=np.float64):
+                engine.push(row)
+            source, target, weight = engine.edges(top_k)
+            builder.add_edges('correlation', nodes[source], nodes[target], weight)
+
+    graph = builder.build(self_loops=self_loops)
+    return graph if symbols is None else graph.subgraph(symbol_master.map_column(symbols, 'yahoo'))
+
+
+def _deduplicate(source, target, weight, num_nodes, reduce):
+    keys = source * num_nodes + target
+    order = np.argsort(keys, kind='stable')
+    keys, weight = keys[order], weight[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.zeros(0, dtype=np.int64)
+    if reduce == 'max':
+        merged = np.maximum.reduceat(weight, starts) if len(keys) else weight
+    elif reduce == 'sum':
+        merged = np.add.reduceat(weight, starts) if len(keys) else weight
+    else:
+        raise ValueError(f"Unknown reduce '{reduce}', expected 'max' or 'sum'")
+    source, target = np.divmod(keys[starts], num_nodes)
+    return sp.csr_matrix((merged, (source, target)), shape=(num_nodes, num_nodes))
+
+
+def normalise_adjacency(adjacency, self_loops=True):
+    """D^-1/2 (A + I) D^-1/2, with degrees from absolute weights so negative correlations keep a valid scale."""
+    if self_loops:
+        adjacency = adjacency + sp.identity(adjacency.shape[0], format='csr')
+    degree = np.asarray(abs(adjacency).sum(axis=1)).ravel()
+    scale = np.zeros_like(degree)
+    scale[degree > 0] = degree[degree > 0] ** -0.5
+    return (sp.diags(scale) @ adjacency @ sp.diags(scale)).tocsr()
+
+
+class RelationalGraph:
+    """One CSR adjacency per relation, raw (`adjacency`) and symmetrically normalised (`normalised`).
+
+    The normalised matrices are computed once here; `to_torch` hands them to `RelationalGraphConv` as sparse
+    CSR tensors (cached per device), so the layers never renormalise per step. `edge_tensors` gives the
+    concatenated edge_index / edge_type / edge_attr for PyG layers such as RGCNConv.
+    """
+
+    def __init__(self, adjacency, self_loops=True):
+        self.self_loops = self_loops
+        self.relations = list(adjacency)
+        self.adjacency = adjacency
+        self.num_nodes = next(iter(adjacency.values())).shape[0] if adjacency else 0
+        self.normalised = {r: normalise_adjacency(a, self_loops) for r, a in adjacency.items()}
+        self._torch = {}
+
+    def __repr__(self):
+        edges = ', '.join(f'{r}={a.nnz}' for r, a in self.adjacency.items())
+        return f'RelationalGraph(num_nodes={self.num_nodes}, {edges})'
+
+    def subgraph(self, node_ids):
+        """Graph over `node_ids` in that order (e.g. symbol-master ids of a panel's symbols); -1 gets no edges."""
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        rows = np.flatnonzero(node_ids >= 0)
+        selector = sp.csr_matrix((np.ones(len(rows)), (rows, node_ids[rows])),
+                                 shape=(len(node_ids), self.num_nodes))
+        adjacency = {r: (selector @ a @ selector.T).tocsr() for r, a in self.adjacency.items()}
+        return RelationalGraph(adjacency, self_loops=self.self_loops)
+
+    def to_torch(self, device='cpu', dtype=None):
+        """[normalised adjacency per relation] as torch sparse CSR tensors, in `relations` order."""
+        import torch
+
+        key = (str(device), dtype)
+        if key not in self._torch:
+            dtype = dtype or torch.float32
+            with warnings.catch_warnings():
+                # torch flags sparse CSR support as beta; sparse.mm with CSR is what the layers rely on
+                warnings.simplefilter('ignore', UserWarning)
+                self._torch[key] = self._csr_tensors(dtype, device)
+        return self._torch[key]
+
+    def _csr_tensors(self, dtype, device):
+        import torch
+
+        return [
+            torch.sparse_csr_tensor(torch.from_numpy(a.indptr.astype(np.int64)),
+                                    torch.from_numpy(a.indices.astype(np.int64)),
+                                    torch.from_numpy(a.data).to(dtype), size=a.shape).to(device)
+            for a in (self.normalised[r] for r in self.relations)]
+
+    def edge_tensors(self, normalised=False):
+        """(edge_index [2, E], edge_type [E], edge_attr [E]) over all relations."""
+        import torch
+
+        matrices = self.normalised if normalised else self.adjacency
+        coos = [matrices[r].tocoo() for r in self.relations]
+        edge_index = np.hstack([np.vstack([c.row, c.col]) for c in coos]).astype(np.int64)
+        edge_type = np.concatenate([np.full(c.nnz, k) for k, c in enumerate(coos)]).astype(np.int64)
+        edge_attr = np.concatenate([c.data for c in coos]).astype(np.float32)
+        return torch.from_numpy(edge_index), torch.from_numpy(edge_type), torch.from_numpy(edge_attr)
+
+    def save(self, path):
+        arrays = {}
+        for k, relation in enumerate(self.relations):
+            a = self.adjacency[relation]
+            arrays.update({f'{k}_indptr': a.indptr, f'{k}_indices': a.indices, f'{k}_data': a.data})
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as f:
+            np.savez(f, relations=np.array(self.relations), num_nodes=self.num_nodes, **arrays)
+        os.replace(f'{path}.tmp', path)
+
+    @classmethod
+    def load(cls, path, self_loops=True):
+        with np.load(path) as f:
+            n = int(f['num_nodes'])
+            adjacency = {str(relation): sp.csr_matrix((f[f'{k}_data'], f[f'{k}_indices'], f[f'{k}_indptr']),
+                                                      shape=(n, n))
+                         for k, relation in enumerate(f['relations'])}
+        return cls(adjacency, self_loops=self_loops)
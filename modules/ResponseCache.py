@@ -0,0 +1,263 @@
+import contextlib
+import datetime as dt
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+RESPONSE_CACHE_DIR = 'data/cache/responses'
+
+# namespace -> seconds a mutable (still open-ended) response stays fresh
+DEFAULT_TTLS = {
+    'get_data': 24 * 3600,
+    'get_history': 3600,
+    'endpoint': 15 * 60,
+}
+DEFAULT_TTL = 3600
+
+# returned by ResponseCache.get on a miss when no default is given, so a cached None or empty payload is a hit
+MISSING = object()
+
+# parameter names that carry the end of a requested range, in get_data parameters or get_history arguments
+END_KEYS = ('EDATE', 'end', 'end_date', 'EndDate')
+
+
+def canonical_json(value):
+    """Order-independent JSON of a request: dict keys sorted, sets sorted, dates ISO, numpy values as Python."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), default=_canonical)
+
+
+def _canonical(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=canonical_json)
+    if isinstance(value, (dt.date, dt.datetime, pd.Timestamp)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def request_key(namespace, **request):
+    return hashlib.sha256(canonical_json({'namespace': namespace, 'request': request}).encode()).hexdigest()
+
+
+def is_historical(request, today=None):
+    """True if the request names an end date before today: its response can no longer change."""
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    candidates = [request] + [v for v in request.values() if isinstance(v, dict)]
+    for mapping in candidates:
+        for key in END_KEYS:
+            end = mapping.get(key)
+            if end not in (None, ''):
+                try:
+                    return pd.Timestamp(end).normalize() < today
+                except (TypeError, ValueError):
+                    return False
+    return False
+
+
+class ResponseCache:
+    """Disk cache of data-API responses keyed by a canonical hash of (namespace, request).
+
+    DataFrames are stored as Parquet with their index (pickle for frames Parquet cannot encode, such as
+    MultiIndex columns), other JSON-serialisable payloads as JSON, and a SQLite index keeps
+    (namespace, size, expiry, last access) per entry. Mutable responses expire after the namespace's TTL
+    (DEFAULT_TTLS); historical ones (an end date before today, or `immutable=True`) never expire and are evicted
+    only after every mutable entry when the cache is over `max_bytes`. Eviction is least recently used.
+    Errors raised by the fetch are not cached; None and empty payloads are, like any other response.
+    """
+
+    def __init__(self, directory=RESPONSE_CACHE_DIR, max_bytes=2 * 1024 ** 3, ttls=None, clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.clock = clock
+        self.stats = {}
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.sqlite')
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    expires REAL,
+                    last_access REAL NOT NULL,
+                    immutable INTEGER NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_eviction ON entries (immutable, last_access)")
+            # Running total of `bytes`, kept in step by put / _delete so a write never sums the whole index
+            conn.execute("CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY CHECK (id = 0), "
+                         "bytes INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO usage SELECT 0, COALESCE(SUM(bytes), 0) FROM entries")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], f'{key}.{fmt}')
+
+    def _count(self, namespace, event):
+        counts = self.stats.setdefault(namespace, {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0})
+        counts[event] += 1
+
+    def get(self, namespace, key, default=None):
+        """Cached value of `key`, or `default` if it is missing or expired (pass MISSING to tell a miss from a
+        cached None)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT format, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            now = self.clock()
+            if row is not None and row[1] is not None and row[1] <= now:
+                self._delete(conn, key, row[0])
+                self._count(namespace, 'expired')
+                row = None
+            if row is None or not os.path.exists(self._path(key, row[0])):
+                self._count(namespace, 'misses')
+                return default
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+        self._count(namespace, 'hits')
+        return self._read(key, row[0])
+
+    def put(self, namespace, key, value, ttl=None, immutable=False):
+        fmt = self._write(key, value)
+
+        now = self.clock()
+        ttl = self.ttls.get(namespace, DEFAULT_TTL) if ttl is None else ttl
+        size = os.path.getsize(self._path(key, fmt))
+        with self._connect() as conn:
+            old = conn.execute("SELECT format, bytes FROM entries WHERE key = ?", (key,)).fetchone()
+            if old is not None and old[0] != fmt:
+                self._remove_file(key, old[0])
+            conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (key, namespace, fmt, size, now, None if immutable else now + ttl, now, int(immutable)))
+            conn.execute("UPDATE usage SET bytes = bytes + ? WHERE id = 0", (size - (0 if old is None else old[1]),))
+            self._evict(conn)
+        return value
+
+    def fetch(self, namespace, fetch, ttl=None, immutable=None, **request):
+        """`fetch(**request)` through the cache; `immutable=None` decides from the request's end date."""
+        key = request_key(namespace, **request)
+        value = self.get(namespace, key, MISSING)
+        if value is not MISSING:
+            return value
+        value = fetch(**request)
+        immutable = is_historical(request) if immutable is None else immutable
+        return self.put(namespace, key, value, ttl, immutable)
+
+    def wrap(self, namespace, fetch, ttl=None, immutable=None):
+        """Cached version of `fetch`, called with keyword arguments only."""
+        return lambda **request: self.fetch(namespace, fetch, ttl, immutable, **request)
+
+    def get_data(self, universe, fields=None, parameters=None, ttl=None, immutable=None, **kwargs):
+        import refinitiv.data as rd
+
+        return self.fetch('get_data', rd.get_data, ttl, immutable, universe=universe, fields=fields,
+                          parameters=parameters, **kwargs)
+
+    def get_history(self, universe, fields=None, ttl=None, immutable=None, **kwargs):
+        import refinitiv.data as rd
+
+        return self.fetch('get_history', rd.get_history, ttl, immutable, universe=universe, fields=fields, **kwargs)
+
+    def make_request(self, make_request, url, method='GET', body_params=None, ttl=None, immutable=False):
+        """JSON payload (`response.data.raw`) of `make_request(url, method, body_params)`, e.g.
+        `EndpointRequest.make_request`; endpoint requests have no end date, so they are mutable by default."""
+        def request(url, method, body_params):
+            return make_request(url, method=method, body_params=body_params).data.raw
+
+        return self.fetch('endpoint', request, ttl, immutable, url=url, method=method, body_params=body_params)
+
+    def _write(self, key, value):
+        if isinstance(value, pd.DataFrame):
+            path = self._path(key, 'parquet')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                # Parquet needs string column names to round-trip; anything else is pickled
+                if not all(isinstance(column, str) for column in value.columns):
+                    raise TypeError("non-string column names")
+                value.to_parquet(f'{path}.tmp')
+                os.replace(f'{path}.tmp', path)
+                return 'parquet'
+            except (TypeError, ValueError):
+                if os.path.exists(f'{path}.tmp'):
+                    os.remove(f'{path}.tmp')
+                path = self._path(key, 'pickle')
+                value.to_pickle(f'{path}.tmp')
+                os.replace(f'{path}.tmp', path)
+                return 'pickle'
+        path = self._path(key, 'json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(value, f, default=_canonical)
+        os.replace(f'{path}.tmp', path)
+        return 'json'
+
+    def _read(self, key, fmt):
+        path = self._path(key, fmt)
+        if fmt == 'parquet':
+            return pd.read_parquet(path)
+        if fmt == 'pickle':
+            return pd.read_pickle(path)
+        with open(path) as f:
+            return json.load(f)
+
+    def _delete(self, conn, key, fmt):
+        row = conn.execute("SELECT bytes FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            conn.execute("UPDATE usage SET bytes = bytes - ? WHERE id = 0", (row[0],))
+        self._remove_file(key, fmt)
+
+    def _remove_file(self, key, fmt):
+        path = self._path(key, fmt)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Mutable entries go first, least recently used first; historical ones only if that is not enough
+        for key, namespace, fmt, size in conn.execute(
+                "SELECT key, namespace, format, bytes FROM entries ORDER BY immutable, last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._delete(conn, key, fmt)
+            self._count(namespace, 'evicted')
+            total -= size
+
+    def clear(self, namespace=None):
+        with self._connect() as conn:
+            where, params = ('', ()) if namespace is None else (' WHERE namespace = ?', (namespace,))
+            for key, fmt in conn.execute(f"SELECT key, format FROM entries{where}", params).fetchall():
+                self._delete(conn, key, fmt)
+
+    def size(self):
+        """(entries, bytes) currently stored."""
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return count, conn.execute("SELECT bytes FROM usage WHERE id = 0").fetchone()[0]
+
+    def summary(self):
+        entries, size = self.size()
+        lines = [f"{entries} entries, {size / 2 ** 20:.1f} MB in {self.directory}"]
+        for namespace, counts in sorted(self.stats.items()):
+            requests = counts['hits'] + counts['misses']
+            rate = counts['hits'] / requests if requests else 0.0
+            lines.append(f"  {namespace}: {counts['hits']} hits / {counts['misses']} misses ({100 * rate:.0f}%), "
+                         f"{counts['expired']} expired, {counts['evicted']} evicted")
+        return '\n'.join(lines)
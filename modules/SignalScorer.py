@@ -0,0 +1,170 @@
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import torch
+
+from modules.TemporalSampler import HORIZONS
+
+
+def signal_columns(horizons=HORIZONS):
+    return [f'signal_{h}d' for h in horizons]
+
+
+class SignalScorer:
+    """Daily cross-sectional signals from a trained model, one column per horizon, for the whole universe.
+
+    `model` is called as `model(x)` or, with a RelationalGraph, `model(x, adjacencies)` on an [N, F] snapshot of
+    `fields`. Everything static is prepared once here: the model is put in eval mode, the graph's sparse
+    adjacencies are built and kept, and each symbol's row position is fixed, so a call only reads the latest
+    cross-section and runs one forward pass under `torch.inference_mode`.
+
+    The snapshot comes from anything with `columns`, `last_date` and `read_cross_section`: the SQLite stores for
+    raw-feature models, or for PropagatedMLP a PropagatedCrossSection, which computes the hop features of the
+    date from the stores. Symbols with no row on the scoring date get NaN signals and are listed in
+    `attrs['missing']`; a missing feature of an observed symbol is fed as 0.
+    """
+
+    def __init__(self, model, symbols, fields, graph=None, horizons=HORIZONS):
+        self.model = model.eval() if isinstance(model, torch.nn.Module) else model
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.horizons = tuple(horizons)
+        self.columns = signal_columns(self.horizons)
+        self.adjacencies = None if graph is None else graph.to_torch()
+        self._inputs = () if self.adjacencies is None else (self.adjacencies,)
+
+    @classmethod
+    def from_file(cls, path, symbols, fields, graph=None, model=None, horizons=HORIZONS):
+        """Scorer over saved weights: a state dict for `model`, a TorchScript file or an ONNX export (.onnx)."""
+        if str(path).endswith('.onnx'):
+            model = OnnxModel(path)
+        elif model is not None:
+            model.load_state_dict(torch.load(path, map_location='cpu'))
+        else:
+            model = torch.jit.load(path, map_location='cpu')
+        return cls(model, symbols, fields, graph, horizons)
+
+    def snapshot(self, stores, date=None):
+        """([N, F] float32 tensor of `fields`, date, [N] bool mask of the symbols observed on the date) for `date`
+        (the latest stored date by default), read from one store or several (e.g. prices and features)."""
+        stores = stores if isinstance(stores, (list, tuple)) else [stores]
+        date = stores[0].last_date() if date is None else pd.Timestamp(date)
+        parts = []
+        for store in stores:
+            fields = [f for f in self.fields if f in store.columns and f not in ('date', 'symbol')]
+            if fields:
+                parts.append(store.read_cross_section(date, fields))
+        frame = pd.concat(parts, axis=1).reindex(index=self.symbols, columns=self.fields)
+        values = frame.to_numpy(dtype=np.float32)
+        observed = ~np.isnan(values).all(axis=1)
+        return torch.from_numpy(np.nan_to_num(values)), date, observed
+
+    def score(self, x):
+        """[N, H] tensor of signals for an [N, F] (or batched [B, N, F]) feature tensor."""
+        with torch.inference_mode():
+            return self.model(x, *self._inputs)
+
+    def score_latest(self, stores, date=None):
+        """Signals on `date` (latest by default) as a symbol x signal_<h>d DataFrame, with the date and the
+        symbols missing on it (NaN signals) in `attrs`."""
+        x, date, observed = self.snapshot(stores, date)
+        values = self.score(x).numpy().astype(np.float64)
+        values[~observed] = np.nan
+        signals = pd.DataFrame(values, index=pd.Index(self.symbols, name='symbol'), columns=self.columns)
+        signals.attrs['date'] = date
+        signals.attrs['missing'] = [s for s, seen in zip(self.symbols, observed) if not seen]
+        return signals
+
+    def export_torchscript(self, path):
+        """Traces the model to a TorchScript file loadable without the model's code.
+
+        Sparse tensors cannot be traced as constants, so a graph model keeps the adjacencies as inputs: load it
+        with `from_file(path, ..., graph=graph)`.
+        """
+        example = (torch.zeros(len(self.symbols), len(self.fields)),) + self._inputs
+        with warnings.catch_warnings():
+            # torch.jit is deprecated in favour of torch.export but still the portable CPU format for now
+            warnings.simplefilter('ignore', FutureWarning)
+            traced = torch.jit.trace(self.model, example, check_trace=False)
+        traced.save(path)
+        return path
+
+    def export_onnx(self, path):
+        """ONNX export of a graph-free model (e.g. PropagatedMLP, scored from a PropagatedCrossSection); ONNX has no
+        sparse matmul for the GNNs."""
+        if self.adjacencies is not None:
+            raise ValueError("ONNX export needs a graph-free model; use export_torchscript for graph models")
+        example = torch.zeros(len(self.symbols), len(self.fields))
+        torch.onnx.export(self.model, (example,), path, input_names=['x'], output_names=['signals'],
+                          dynamic_axes={'x': {0: 'nodes'}, 'signals': {0: 'nodes'}})
+        return path
+
+    def measure_latency(self, stores, date=None, repeats=20):
+        """Median / max milliseconds of the read, forward and end-to-end stages over `repeats` calls."""
+        timings = {'read_ms': [], 'score_ms': [], 'total_ms': []}
+        for _ in range(repeats):
+            start = time.perf_counter()
+            x = self.snapshot(stores, date)[0]
+            read = time.perf_counter()
+            self.score(x)
+            done = time.perf_counter()
+            timings['read_ms'].append(1e3 * (read - start))
+            timings['score_ms'].append(1e3 * (done - read))
+            timings['total_ms'].append(1e3 * (done - start))
+        return {name: {'median': float(np.median(values)), 'max': float(np.max(values))}
+                for name, values in timings.items()}
+
+
+class OnnxModel:
+    """Callable over an onnxruntime session, taking and returning torch tensors like the original model."""
+
+    def __init__(self, path):
+        import onnxruntime
+
+        self.session = onnxruntime.InferenceSession(str(path), providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x):
+        return torch.from_numpy(self.session.run(None, {self.input_name: x.numpy()})[0])
+
+
+def benchmark_scoring(num_symbols=950, num_dates=300, hidden_dim=64, num_edges=50000, num_relations=3, repeats=20,
+                      seed=0):
+    """End-to-end latency of scoring the latest day for `num_symbols` stocks from an in-memory SQLite store."""
+    import sqlalchemy
+
+    from modules.FeatureStore import FeatureStore
+    from modules.GraphModels import RelationalGNN
+    from modules.PriceStore import PriceStore
+    from modules.RelationalGraph import RelationalGraphBuilder
+    from modules.TrainingBenchmark import synthetic_graph
+
+    rng = np.random.default_rng(seed)
+    store = PriceStore(sqlalchemy.create_engine('sqlite://'))
+    dates = pd.bdate_range('2020-01-01', periods=num_dates)
+    symbols = [f'S{i:04d}' for i in range(num_symbols)]
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal(num_dates)))
+        store.write(symbol, pd.DataFrame({'date': dates, 'open': close, 'high': close, 'low': close, 'close': close,
+                                          'volume': 1e6}))
+    features = FeatureStore(store)
+    features.rebuild(symbols)
+
+    edge_index, edge_type = synthetic_graph(num_symbols, num_edges, num_relations, seed)
+    builder = RelationalGraphBuilder(num_symbols)
+    for r in range(num_relations):
+        in_relation = (edge_type == r).numpy()
+        builder.add_edges(f'relation_{r}', edge_index[0].numpy()[in_relation], edge_index[1].numpy()[in_relation])
+    graph = builder.build()
+
+    fields = ['close', 'volume'] + features.feature_engine.feature_names
+    model = RelationalGNN(len(fields), hidden_dim, len(HORIZONS), len(graph.relations))
+    scorer = SignalScorer(model, symbols, fields, graph)
+    return scorer.measure_latency([store, features], repeats=repeats)
+
+
+if __name__ == '__main__':
+    for stage, stats in benchmark_scoring().items():
+        print(f"{stage:9s} median {stats['median']:7.2f} ms  max {stats['max']:7.2f} ms")
@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+LISTING_FILE = 'data/Final_Downloaded_List.csv'
+SYMBOL_MASTER_FILE = 'data/symbol_master.csv'
+
+# id type -> column of the Eikon listing export
+LISTING_COLUMNS = {
+    'ticker': 'TickerSymbol',      # NSE symbol, as in the bulk-deal files: BEL
+    'ric': 'RIC',                  # Eikon RIC: BAJE.NS
+    'isin': 'IssueISIN',           # INE263A01024
+    'permid': 'IssuerOAPermID',    # Organisation PermID, as in the value-chain workbooks: 4295873541
+    'eikon': 'Symbol',             # Eikon screener code: IN:BHE
+}
+ID_TYPES = tuple(LISTING_COLUMNS) + ('yahoo',)    # yfinance ticker: BEL.NS
+YAHOO_SUFFIX = '.NS'
+
+
+def normalise_identifiers(values, id_type):
+    """Identifier strings as stored in the master: stripped, PermIDs as integer strings, missing as ''."""
+    values = pd.Series(values)
+    if id_type == 'permid' and pd.api.types.is_numeric_dtype(values):
+        return values.map(lambda v: '' if pd.isna(v) else str(int(v))).to_numpy(dtype=object)
+    values = values.fillna('').astype(str).str.strip()
+    if id_type == 'permid':
+        values = values.str.replace(r'\.0$', '', regex=True)
+    return values.to_numpy(dtype=object)
+
+
+class SymbolMaster:
+    """One integer node id per security, shared by prices, bulk deals, value chains and the GNN node tensors.
+
+    Every id type (see ID_TYPES) gets a hash index from identifier to node id. Aliases, such as the old symbol
+    of a renamed company, are extra keys in the same indexes. Whole columns are mapped with `map_column`, which
+    is one vectorised hash lookup (pd.Index.get_indexer) rather than a string join. Node ids are row positions
+    of `securities` and never change once assigned: `add_securities` only appends.
+    """
+
+    def __init__(self, securities, aliases=None):
+        self.securities = securities.reset_index(drop=True)
+        self.aliases = (pd.DataFrame(columns=['id_type', 'value', 'node_id']) if aliases is None
+                        else aliases.reset_index(drop=True))
+        self._build_indexes()
+
+    @classmethod
+    def from_listing(cls, path=LISTING_FILE):
+        """Master built from an Eikon listing export (Final_Downloaded_List.csv or the filtered xlsx)."""
+        df = pd.read_excel(path) if path.endswith('.xlsx') else pd.read_csv(path)
+        securities = pd.DataFrame({id_type: normalise_identifiers(df[column], id_type)
+                                   for id_type, column in LISTING_COLUMNS.items()})
+        securities['yahoo'] = np.where(securities['ticker'] != '', securities['ticker'] + YAHOO_SUFFIX, '')
+        securities['name'] = df['Name'].to_numpy()
+        securities['sector'] = df['Sector'].to_numpy()
+        return cls(securities)
+
+    @classmethod
+    def load(cls, path=SYMBOL_MASTER_FILE):
+        read = lambda p: pd.read_csv(p, dtype=str, keep_default_na=False)
+        securities = read(path).drop(columns='node_id')
+        aliases_path = _aliases_path(path)
+        aliases = read(aliases_path).astype({'node_id': np.int64}) if os.path.exists(aliases_path) else None
+        return cls(securities, aliases)
+
+    def save(self, path=SYMBOL_MASTER_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        for df, target in ((self.securities.rename_axis('node_id').reset_index(), path),
+                           (self.aliases, _aliases_path(path))):
+            df.to_csv(f'{target}.tmp', index=False)
+            os.replace(f'{target}.tmp', target)
+
+    def _build_indexes(self):
+        self._indexes = {}
+        for id_type in ID_TYPES:
+            values = self.securities[id_type].to_numpy(dtype=object)
+            nodes = np.arange(len(values), dtype=np.int64)
+            aliases = self.aliases[self.aliases['id_type'] == id_type]
+            keys = np.concatenate([values, aliases['value'].to_numpy(dtype=object)])
+            nodes = np.concatenate([nodes, aliases['node_id'].to_numpy(dtype=np.int64)])
+
+            keep = keys != ''
+            keys, nodes = keys[keep], nodes[keep]
+            index = pd.Index(keys)
+            if not index.is_unique:
+                duplicated = sorted(set(index[index.duplicated()]))
+                raise ValueError(f"Identifiers of type '{id_type}' map to more than one node: {duplicated[:10]}")
+            self._indexes[id_type] = (index, nodes)
+
+    def __len__(self):
+        return len(self.securities)
+
+    def map_column(self, values, id_type='ticker'):
+        """Node ids of a column of identifiers (int64 array, -1 where unknown)."""
+        index, nodes = self._indexes[id_type]
+        positions = index.get_indexer(normalise_identifiers(values, id_type))
+        return np.where(positions >= 0, nodes[positions], -1)
+
+    def node_id(self, value, id_type='ticker'):
+        """Node id of one identifier; KeyError if unknown."""
+        index, nodes = self._indexes[id_type]
+        return int(nodes[index.get_loc(normalise_identifiers([value], id_type)[0])])
+
+    def identifiers(self, id_type='ticker', node_ids=None):
+        """Current identifiers of `node_ids` (all nodes, in node order, by default)."""
+        values = self.securities[id_type].to_numpy(dtype=object)
+        return values if node_ids is None else values[np.asarray(node_ids)]
+
+    def node_index(self, id_type='ticker'):
+        """{identifier: node id}, aliases included."""
+        index, nodes = self._indexes[id_type]
+        return dict(zip(index, nodes.tolist()))
+
+    def add_alias(self, id_type, value, current):
+        """Registers `value` (e.g. a pre-rename symbol) as another identifier of the node of `current`."""
+        node = self.node_id(current, id_type)
+        value = normalise_identifiers([value], id_type)[0]
+        self.aliases = pd.concat([self.aliases, pd.DataFrame({'id_type': [id_type], 'value': [value],
+                                                              'node_id': [node]})], ignore_index=True)
+        self._build_indexes()
+        return node
+
+    def add_securities(self, securities):
+        """Appends securities not known under any identifier; returns the node ids of all rows of `securities`.
+
+        A known security arriving with a different identifier (a rename matched through its ISIN or PermID) takes
+        the new one as current, and the old one is kept as an alias, so both resolve to the same node.
+        """
+        securities = securities.reset_index(drop=True)
+        known = np.full(len(securities), -1, dtype=np.int64)
+        for id_type in ID_TYPES:
+            if id_type in securities:
+                known = np.where(known >= 0, known, self.map_column(securities[id_type], id_type))
+        self._rename(securities, known)
+
+        new = securities[known < 0].reindex(columns=self.securities.columns).fillna('')
+        known[known < 0] = np.arange(len(self.securities), len(self.securities) + len(new))
+        self.securities = pd.concat([self.securities, new], ignore_index=True)
+        self._build_indexes()
+        return known
+
+    def _rename(self, securities, nodes):
+        """Moves changed identifiers of the known rows (`nodes >= 0`) to current, the replaced ones to aliases."""
+        rows = np.flatnonzero(nodes >= 0)
+        aliases = [self.aliases]
+        for id_type in ID_TYPES:
+            if id_type not in securities:
+                continue
+            incoming = normalise_identifiers(securities[id_type], id_type)[rows]
+            current = self.securities[id_type].to_numpy(dtype=object)[nodes[rows]]
+            changed = (incoming != '') & (incoming != current)
+            # A value that already names another node is a clash, not a rename
+            owner = self.map_column(incoming[changed], id_type)
+            changed[changed] = (owner < 0) | (owner == nodes[rows][changed])
+            if not changed.any():
+                continue
+            renamed = pd.DataFrame({'node_id': nodes[rows][changed], 'old': current[changed],
+                                    'new': incoming[changed]}).drop_duplicates('node_id', keep='last')
+            self.securities.loc[renamed['node_id'].to_numpy(), id_type] = renamed['new'].to_numpy()
+            revived = (aliases[0]['id_type'] == id_type) & aliases[0]['value'].isin(renamed['new'])
+            aliases[0] = aliases[0][~revived]
+            old = renamed[renamed['old'] != '']
+            aliases.append(pd.DataFrame({'id_type': id_type, 'value': old['old'].to_numpy(),
+                                         'node_id': old['node_id'].to_numpy()}))
+        for column in ('name', 'sector'):
+            if column in securities and column in self.securities:
+                values = securities[column].to_numpy()[rows]
+                filled = pd.notna(values) & (values != '')
+                self.securities.loc[nodes[rows][filled], column] = values[filled]
+        self.aliases = pd.concat(aliases, ignore_index=True)
+        self._build_indexes()
+
+
+def _aliases_path(path):
+    root, ext = os.path.splitext(path)
+    return f'{root}_aliases{ext}'
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import torch
+
+
+class TemporalGraphStore:
+    """Daily graph snapshots without one Data object (and one copy of the edges) per snapshot.
+
+    Node features are a single [T, N, F] tensor (targets, if any, a single [T, N, ...] tensor), and every edge is
+    stored once with its validity interval [start, end) in snapshot positions, so memory grows with the number of
+    edge changes rather than snapshots x edges. Between two interval boundaries the edge set is constant; such a
+    segment's edge tensors are built on first use and kept in a small LRU cache, and `store[t]` is a
+    torch_geometric Data whose x / y are views of row t.
+
+    `x` may be a tensor, an array or `PanelCache.as_tensor()`. Positions can be given as dates when `dates` is set.
+    """
+
+    def __init__(self, x, y=None, dates=None, cache_segments=64):
+        self.x = torch.as_tensor(x)
+        self.y = None if y is None else torch.as_tensor(y)
+        self.dates = None if dates is None else pd.DatetimeIndex(dates)
+        self.num_snapshots, self.num_nodes = self.x.shape[0], self.x.shape[1]
+        self.cache_segments = cache_segments
+        self._parts = []
+        self._edges = None
+        self._boundaries = None
+        self._segment_cache = OrderedDict()
+
+    @classmethod
+    def from_snapshots(cls, x, snapshots, y=None, dates=None, **kwargs):
+        """Store from one (edge_index, edge_type, edge_attr) per snapshot, keeping only the changes between them.
+
+        An edge (source, target, type) whose weight is unchanged from the previous snapshot extends its interval;
+        a new, removed or re-weighted edge closes / opens one. Duplicate edges within a snapshot keep the first.
+        `edge_attr` may be [E] or [E, D]; with D columns an edge continues only if all of them are unchanged.
+        """
+        store = cls(x, y, dates, **kwargs)
+        open_keys = np.zeros(0, dtype=np.int64)
+        open_attr = np.zeros(0, dtype=np.float32)
+        open_start = np.zeros(0, dtype=np.int64)
+
+        t = -1
+        for t, (edge_index, edge_type, edge_attr) in enumerate(snapshots):
+            keys, attr = store._edge_keys(edge_index, edge_type, edge_attr)
+            keys, first = np.unique(keys, return_index=True)
+            attr = attr[first]
+
+            kept = np.zeros(len(open_keys), dtype=bool)
+            start = np.full(len(keys), t, dtype=np.int64)
+            if len(open_keys):
+                at = np.searchsorted(open_keys, keys).clip(max=len(open_keys) - 1)
+                same_attr = (open_attr[at] == attr).reshape(len(keys), -1).all(axis=1)
+                continuing = (open_keys[at] == keys) & same_attr
+                kept[at[continuing]] = True
+                start[continuing] = open_start[at[continuing]]
+
+            store._add_keys(open_keys[~kept], open_attr[~kept], open_start[~kept], t)
+            open_keys, open_attr, open_start = keys, attr, start
+
+        store._add_keys(open_keys, open_attr, open_start, t + 1)
+        return store
+
+    def _edge_keys(self, edge_index, edge_type, edge_attr):
+        edge_index = np.asarray(edge_index, dtype=np.int64)
+        edge_type = np.zeros(edge_index.shape[1], dtype=np.int64) if edge_type is None else np.asarray(edge_type)
+        edge_attr = np.ones(edge_index.shape[1], dtype=np.float32) if edge_attr is None else np.asarray(edge_attr)
+        keys = (edge_type.astype(np.int64) * self.num_nodes + edge_index[0]) * self.num_nodes + edge_index[1]
+        return keys, edge_attr.astype(np.float32)
+
+    def _add_keys(self, keys, attr, start, end):
+        if len(keys):
+            source, target = np.divmod(keys % (self.num_nodes * self.num_nodes), self.num_nodes)
+            interval = lambda t: np.broadcast_to(np.asarray(t, dtype=np.int64), (len(keys),))
+            self._append(source, target, keys // (self.num_nodes * self.num_nodes), attr, interval(start),
+                         interval(end))
+
+    def add_edges(self, edge_index, edge_type=None, edge_attr=None, start=0, end=None):
+        """Adds edges valid for snapshots in [start, end) (positions or dates; defaults to all snapshots)."""
+        keys, attr = self._edge_keys(edge_index, edge_type, edge_attr)
+        end = self.num_snapshots if end is None else self.position(end)
+        self._add_keys(keys, attr, self.position(start), end)
+
+    def _append(self, source, target, edge_type, attr, start, end):
+        self._parts.append((source, target, edge_type, attr, start, end))
+        self._edges = None
+        self._boundaries = None
+        self._segment_cache.clear()
+
+    def position(self, t):
+        """Snapshot position of an int position or a date (first snapshot on or after it)."""
+        if isinstance(t, (int, np.integer)) or (isinstance(t, np.ndarray) and t.dtype.kind == 'i'):
+            return t
+        return int(self.dates.searchsorted(pd.Timestamp(t), side='left'))
+
+    def _snapshot_position(self, t):
+        """Position of one snapshot, counting from the end for negative ints like a sequence."""
+        t = self.position(t)
+        return t + self.num_snapshots if t < 0 else t
+
+    @property
+    def edges(self):
+        """Edge records as numpy arrays: source, target, edge_type, edge_attr, start, end."""
+        if self._edges is None:
+            names = ('source', 'target', 'edge_type', 'edge_attr', 'start', 'end')
+            if self._parts:
+                columns = [np.concatenate(column) for column in zip(*self._parts)]
+            else:
+                columns = [np.zeros(0, dtype=np.int64)] * 3 + [np.zeros(0, dtype=np.float32)] + \
+                          [np.zeros(0, dtype=np.int64)] * 2
+            self._edges = dict(zip(names, columns))
+            self._parts = [tuple(self._edges[name] for name in names)] if self._parts else []
+        return self._edges
+
+    @property
+    def num_edge_records(self):
+        return len(self.edges['source'])
+
+    @property
+    def boundaries(self):
+        """Sorted snapshot positions where the edge set changes; segment k covers [boundaries[k], boundaries[k+1])."""
+        if self._boundaries is None:
+            edges = self.edges
+            points = np.concatenate([[0, self.num_snapshots], edges['start'], edges['end']])
+            self._boundaries = np.unique(points.clip(0, self.num_snapshots))
+        return self._boundaries
+
+    def segment_of(self, t):
+        return int(np.searchsorted(self.boundaries, t, side='right')) - 1
+
+    def segment_edges(self, k):
+        """(edge_index, edge_type, edge_attr) tensors shared by every snapshot of segment k."""
+        if k in self._segment_cache:
+            self._segment_cache.move_to_end(k)
+            return self._segment_cache[k]
+        edges = self.edges
+        t = self.boundaries[k]
+        live = (edges['start'] <= t) & (edges['end'] > t)
+        tensors = (torch.from_numpy(np.vstack([edges['source'][live], edges['target'][live]])),
+                   torch.from_numpy(edges['edge_type'][live]),
+                   torch.from_numpy(edges['edge_attr'][live]))
+        self._segment_cache[k] = tensors
+        if len(self._segment_cache) > self.cache_segments:
+            self._segment_cache.popitem(last=False)
+        return tensors
+
+    def edges_at(self, t):
+        return self.segment_edges(self.segment_of(self._snapshot_position(t)))
+
+    def segments(self):
+        """Yields (start, end, edge_index, edge_type, edge_attr) for every constant-edge segment, in time order."""
+        boundaries = self.boundaries
+        for k in range(len(boundaries) - 1):
+            yield (int(boundaries[k]), int(boundaries[k + 1])) + self.segment_edges(k)
+
+    def snapshot(self, t):
+        from torch_geometric.data import Data
+
+        t = self._snapshot_position(t)
+        edge_index, edge_type, edge_attr = self.edges_at(t)
+        data = Data(x=self.x[t], edge_index=edge_index, edge_type=edge_type, edge_attr=edge_attr,
+                    num_nodes=self.num_nodes)
+        if self.y is not None:
+            data.y = self.y[t]
+        return data
+
+    def __len__(self):
+        return self.num_snapshots
+
+    def __getitem__(self, t):
+        return self.snapshot(t)
+
+    def __iter__(self):
+        return (self.snapshot(t) for t in range(self.num_snapshots))
@@ -0,0 +1,119 @@
+import time
+
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+
+HORIZONS = (5, 10, 30, 60)
+
+
+def forward_log_returns(close, horizons=HORIZONS):
+    """[T, N, H] log(close[t + h] / close[t]) for every horizon h; NaN where t + h is past the end."""
+    close = torch.as_tensor(close, dtype=torch.float32)
+    log_close = close.log()
+    targets = torch.full(close.shape + (len(horizons),), float('nan'))
+    for k, h in enumerate(horizons):
+        targets[:-h, :, k] = log_close[h:] - log_close[:-h]
+    return targets
+
+
+class TemporalWindowDataset(Dataset):
+    """(lookback window, horizon targets) samples anchored on snapshot positions in [start, end).
+
+    The sample anchored at t holds features x[t - lookback + 1 .. t] and targets[t] (returns from t to t + h).
+    Only anchors whose longest-horizon target is observed before `end` are used, so a dataset never sees a price
+    from after its own period (the validation period starting at `end` in particular).
+
+    Items are whole batches: the DataLoader's sampler hands over a list of anchor indices and the batch is one
+    gather from an unfold view of the stacked [T, N, F] tensor, [B, lookback, N, F], with no per-snapshot collation.
+    Edges are not copied into batches; use `store.edges_at(t)` of the TemporalGraphStore (cached per segment).
+    """
+
+    def __init__(self, x, targets, lookback, horizons=HORIZONS, start=0, end=None):
+        self.x = torch.as_tensor(x)
+        self.targets = torch.as_tensor(targets)
+        self.lookback = lookback
+        self.horizons = tuple(horizons)
+        end = self.x.shape[0] if end is None else end
+        first = max(start, lookback - 1)
+        self.anchors = torch.arange(first, max(end - max(self.horizons), first))
+        # [T - lookback + 1, N, F, lookback] view; window j covers snapshots j .. j + lookback - 1
+        self._windows = self.x.unfold(0, lookback, 1)
+
+    def __len__(self):
+        return len(self.anchors)
+
+    def __getitem__(self, indices):
+        t = self.anchors[torch.as_tensor(indices)]
+        x = self._windows[t - self.lookback + 1].permute(0, 3, 1, 2)
+        y = self.targets[t]
+        return {'x': x, 'y': y, 'mask': ~torch.isnan(y), 't': t}
+
+
+class TemporalBatchSampler(Sampler):
+    """Yields lists of dataset indices: shuffled within the dataset's own period, or in time order."""
+
+    def __init__(self, dataset, batch_size, shuffle=True, drop_last=False, seed=0):
+        self.num_samples = len(dataset)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.generator = torch.Generator().manual_seed(seed)
+
+    def __iter__(self):
+        order = torch.randperm(self.num_samples, generator=self.generator) if self.shuffle else \
+            torch.arange(self.num_samples)
+        for i in range(0, self.num_samples, self.batch_size):
+            batch = order[i:i + self.batch_size]
+            if len(batch) < self.batch_size and self.drop_last:
+                break
+            yield batch.tolist()
+
+    def __len__(self):
+        if self.drop_last:
+            return self.num_samples // self.batch_size
+        return -(-self.num_samples // self.batch_size)
+
+
+def temporal_loader(dataset, batch_size=32, shuffle=True, num_workers=0, prefetch_factor=2, seed=0, **kwargs):
+    """DataLoader over whole batches of `dataset`, prefetched by `num_workers` worker processes."""
+    sampler = TemporalBatchSampler(dataset, batch_size, shuffle=shuffle, seed=seed)
+    if num_workers:
+        kwargs.update(prefetch_factor=prefetch_factor, persistent_workers=True)
+    return DataLoader(dataset, sampler=sampler, batch_size=None, num_workers=num_workers, **kwargs)
+
+
+def benchmark_sampler(num_snapshots=2000, num_nodes=950, num_features=8, lookback=20, batch_size=32,
+                      num_workers=(0, 2), batches=50):
+    """Snapshots per second delivered by the window sampler versus collating per-snapshot Data objects."""
+    from torch_geometric.data import Data
+    from torch_geometric.loader import DataLoader as GraphDataLoader
+
+    x = torch.randn(num_snapshots, num_nodes, num_features)
+    close = torch.exp(torch.randn(num_snapshots, num_nodes).mul(0.02).cumsum(0))
+    targets = forward_log_returns(close)
+    dataset = TemporalWindowDataset(x, targets, lookback)
+    results = {}
+
+    for workers in num_workers:
+        loader = temporal_loader(dataset, batch_size=batch_size, num_workers=workers)
+        iterator = iter(loader)
+        next(iterator)
+        start = time.perf_counter()
+        for _ in range(batches):
+            next(iterator)
+        results[f'window_sampler_workers_{workers}'] = batches * batch_size * lookback / (time.perf_counter() - start)
+
+    # The notebook's approach: one Data object per snapshot, batches collated by the PyG DataLoader
+    data_list = [Data(x=x[t].clone(), y=targets[t].clone()) for t in range(num_snapshots)]
+    iterator = iter(GraphDataLoader(data_list, batch_size=batch_size * lookback, shuffle=True))
+    done = min(batches, len(data_list) // (batch_size * lookback))
+    start = time.perf_counter()
+    for _ in range(done):
+        next(iterator)
+    results['data_list_collation'] = done * batch_size * lookback / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == '__main__':
+    for name, rate in benchmark_sampler().items():
+        print(f'{name:32s} {rate:12,.0f} snapshots/s')
@@ -0,0 +1,226 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import torch
+
+from modules.GraphModels import GNN, RelationalGNN
+from modules.RelationalGraph import RelationalGraphBuilder
+from modules.TemporalGraph import TemporalGraphStore
+
+
+def synthetic_graph(num_nodes, num_edges, num_relations=1, seed=0):
+    """Random directed edges without self loops: edge_index [2, E] and edge_type [E]."""
+    rng = np.random.default_rng(seed)
+    source = rng.integers(0, num_nodes, num_edges)
+    target = (source + rng.integers(1, num_nodes, num_edges)) % num_nodes
+    edge_index = torch.from_numpy(np.vstack([source, target]))
+    edge_type = torch.from_numpy(rng.integers(0, num_relations, num_edges))
+    return edge_index, edge_type
+
+
+def synthetic_store(num_nodes, num_edges, num_snapshots, num_features, num_relations=1, seed=0):
+    """TemporalGraphStore with random features / targets and one static random graph."""
+    generator = torch.Generator().manual_seed(seed)
+    x = torch.randn(num_snapshots, num_nodes, num_features, generator=generator)
+    y = torch.randn(num_snapshots, num_nodes, 1, generator=generator)
+    store = TemporalGraphStore(x, y=y)
+    edge_index, edge_type = synthetic_graph(num_nodes, num_edges, num_relations, seed)
+    store.add_edges(edge_index, edge_type)
+    return store
+
+
+def _gcn(store, num_features, hidden_dim, num_relations):
+    model = GNN(num_features, hidden_dim, 1)
+    return model, model
+
+
+def _relational(store, num_features, hidden_dim, num_relations):
+    builder = RelationalGraphBuilder(store.num_nodes)
+    edges = store.edges
+    for r in range(num_relations):
+        in_relation = edges['edge_type'] == r
+        builder.add_edges(f'relation_{r}', edges['source'][in_relation], edges['target'][in_relation])
+    adjacencies = builder.build().to_torch()
+    model = RelationalGNN(num_features, hidden_dim, 1, len(adjacencies))
+    return model, lambda data: model(data.x, adjacencies)
+
+
+# name -> factory(store, num_features, hidden_dim, num_relations) returning (module, forward(data))
+MODELS = {
+    'gcn': _gcn,
+    'relational': _relational,
+}
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far (a lifetime high-water mark: see `run_isolated`)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_training_benchmark(model='gcn', num_nodes=1000, num_edges=10000, num_snapshots=10, num_features=8,
+                           hidden_dim=64, num_relations=3, epochs=2, warmup_epochs=1, feature_pool=256,
+                           traced_steps=5, lr=1e-3, seed=0):
+    """Trains `model` one snapshot per step and reports time per snapshot split into load / forward / backward.
+
+    Features and targets are drawn for `min(num_snapshots, feature_pool)` distinct snapshots and reused
+    cyclically, so 50k nodes x 5000 snapshots does not need 5000 feature matrices in memory; loading still goes
+    through TemporalGraphStore for every step. The first `warmup_epochs` epochs are not timed, so `epochs` must
+    be larger. Over `traced_steps` extra steps tracemalloc gives the peak of Python-level allocations (tensor
+    storage excluded) and the growth of live Python blocks per step, a leak indicator rather than an allocation
+    count: a steady-state loop reports about 0 however much it allocates and frees.
+
+    `peak_rss_mb` is the process's lifetime peak, so it only describes this run in a fresh process
+    (`run_isolated`); `rss_growth_mb` is that peak minus the resident memory before the run started.
+    """
+    if epochs <= warmup_epochs:
+        raise ValueError(f"epochs ({epochs}) must be larger than warmup_epochs ({warmup_epochs}): "
+                         f"warmup epochs are not timed")
+    torch.manual_seed(seed)
+    config = {k: v for k, v in locals().items()}
+    baseline_rss = peak_rss_mb()
+    store = synthetic_store(num_nodes, num_edges, min(num_snapshots, feature_pool), num_features,
+                            num_relations, seed)
+    module, forward = MODELS[model](store, num_features, hidden_dim, num_relations)
+    optimizer = torch.optim.Adam(module.parameters(), lr=lr)
+    criterion = torch.nn.MSELoss()
+
+    def step(t, timings):
+        start = time.perf_counter()
+        data = store[t % len(store)]
+        loaded = time.perf_counter()
+        optimizer.zero_grad()
+        loss = criterion(forward(data), data.y)
+        forwarded = time.perf_counter()
+        loss.backward()
+        optimizer.step()
+        done = time.perf_counter()
+        if timings is not None:
+            timings[0] += loaded - start
+            timings[1] += forwarded - loaded
+            timings[2] += done - forwarded
+        return loss.item()
+
+    timings = [0.0, 0.0, 0.0]
+    timed_steps = 0
+    losses = []
+    for epoch in range(epochs):
+        timed = epoch >= warmup_epochs
+        epoch_loss = sum(step(t, timings if timed else None) for t in range(num_snapshots))
+        losses.append(epoch_loss / num_snapshots)
+        timed_steps += num_snapshots if timed else 0
+
+    tracemalloc.start()
+    blocks_before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    for t in range(traced_steps):
+        step(t, None)
+    blocks_after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    load, fwd, bwd = (1e3 * value / max(timed_steps, 1) for value in timings)
+    return {
+        'config': config,
+        'metrics': {
+            'load_ms_per_snapshot': load,
+            'forward_ms_per_snapshot': fwd,
+            'backward_ms_per_snapshot': bwd,
+            'step_ms_per_snapshot': load + fwd + bwd,
+            'snapshots_per_second': 1e3 / (load + fwd + bwd),
+            'data_loading_share': load / (load + fwd + bwd),
+            'peak_rss_mb': peak_rss_mb(),
+            'rss_growth_mb': peak_rss_mb() - baseline_rss,
+            'python_alloc_peak_mb': traced_peak / 2 ** 20,
+            'python_retained_blocks_per_step': (blocks_after - blocks_before) / max(traced_steps, 1),
+            'parameters': sum(p.numel() for p in module.parameters()),
+            'final_loss': losses[-1],
+        },
+    }
+
+
+def run_isolated(*args, **kwargs):
+    """`run_training_benchmark` in a fresh spawned process, so its peak RSS is not that of an earlier, larger run."""
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(run_training_benchmark, *args, **kwargs).result()
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'torch_threads': torch.get_num_threads(),
+        'git_commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def write_results(results, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump({'environment': environment(), 'runs': results}, f, indent=1)
+    os.replace(f'{path}.tmp', path)
+
+
+def compare_results(baseline_path, candidate_path, metric='step_ms_per_snapshot'):
+    """{config: candidate / baseline} of `metric` for the runs both files share (> 1 means slower / bigger)."""
+    def load(path):
+        with open(path) as f:
+            runs = json.load(f)['runs']
+        return {json.dumps(run['config'], sort_keys=True): run['metrics'][metric] for run in runs}
+
+    baseline, candidate = load(baseline_path), load(candidate_path)
+    return {key: candidate[key] / baseline[key] for key in baseline.keys() & candidate.keys() if baseline[key]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GNN training benchmark on synthetic graphs; lists run as a grid")
+    parser.add_argument('--model', nargs='+', default=['gcn'], choices=sorted(MODELS))
+    parser.add_argument('--nodes', nargs='+', type=int, default=[1000])
+    parser.add_argument('--edges', nargs='+', type=int, default=[10000])
+    parser.add_argument('--snapshots', nargs='+', type=int, default=[10])
+    parser.add_argument('--features', type=int, default=8)
+    parser.add_argument('--hidden', type=int, default=64)
+    parser.add_argument('--relations', type=int, default=3)
+    parser.add_argument('--epochs', type=int, default=2)
+    parser.add_argument('--warmup', type=int, default=1, help="untimed epochs, fewer than --epochs")
+    parser.add_argument('--out', default='data/cache/benchmarks/training_benchmark.json')
+    args = parser.parse_args(argv)
+    if args.epochs <= args.warmup:
+        parser.error(f"--epochs ({args.epochs}) must be larger than --warmup ({args.warmup})")
+
+    results = []
+    for model, nodes, edges, snapshots in itertools.product(args.model, args.nodes, args.edges, args.snapshots):
+        # One process per configuration: peak RSS is a process-lifetime figure
+        result = run_isolated(model, nodes, edges, snapshots, args.features, args.hidden, args.relations,
+                              args.epochs, args.warmup)
+        metrics = result['metrics']
+        print(f"{model:10s} nodes={nodes:<6d} edges={edges:<8d} snapshots={snapshots:<5d} "
+              f"step {metrics['step_ms_per_snapshot']:8.2f} ms (fwd {metrics['forward_ms_per_snapshot']:.2f}, "
+              f"bwd {metrics['backward_ms_per_snapshot']:.2f}, load {100 * metrics['data_loading_share']:.1f}%) "
+              f"peak RSS {metrics['peak_rss_mb']:.0f} MB (+{metrics['rss_growth_mb']:.0f} MB)")
+        results.append(result)
+    write_results(results, args.out)
+    print(f"Wrote {len(results)} runs to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
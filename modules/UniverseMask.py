@@ -0,0 +1,151 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.SymbolMaster import LISTING_COLUMNS, LISTING_FILE, YAHOO_SUFFIX, normalise_identifiers
+
+
+def listing_dates(path=LISTING_FILE):
+    """yfinance symbol -> listing date, from the `Start Date` (dd/mm/yyyy) column of the Eikon listing export."""
+    df = pd.read_excel(path) if path.endswith('.xlsx') else pd.read_csv(path)
+    tickers = normalise_identifiers(df[LISTING_COLUMNS['ticker']], 'ticker')
+    dates = pd.to_datetime(df['Start Date'], dayfirst=True, errors='coerce')
+    listed = pd.Series(dates.to_numpy(), index=pd.Index(tickers + YAHOO_SUFFIX))
+    return listed[(tickers != '') & dates.notna().to_numpy()]
+
+
+def delisting_dates(panel, field='close', grace_days=30):
+    """symbol -> first date after its last observed `field`, for symbols silent for over `grace_days` at the end
+    of the panel (a stock that stopped trading, rather than one with a late bar)."""
+    observed = ~np.isnan(panel.field(field))
+    seen = observed.any(axis=0)
+    last = len(panel.dates) - 1 - np.argmax(observed[::-1], axis=0)
+    end = panel.dates[-1]
+    delisted = {}
+    for k in np.flatnonzero(seen):
+        if last[k] + 1 < len(panel.dates) and (end - panel.dates[last[k]]).days > grace_days:
+            delisted[panel.symbols[k]] = panel.dates[last[k] + 1]
+    return pd.Series(delisted, dtype='datetime64[ns]')
+
+
+def interval_mask(dates, columns, keys, starts, ends=None):
+    """[T, N] bool mask, True on dates in [start, end) of any (key, start, end) interval of column `key`.
+
+    One difference array over all intervals: +1 at each interval's first date, -1 at its end, cumulative sum.
+    """
+    dates = pd.DatetimeIndex(dates).to_numpy(dtype='datetime64[ns]')
+    positions = pd.Index(columns).get_indexer(pd.Index(keys))
+    starts = pd.DatetimeIndex(starts).to_numpy(dtype='datetime64[ns]')
+    ends = (np.full(len(starts), np.datetime64('NaT')) if ends is None
+            else pd.DatetimeIndex(ends).to_numpy(dtype='datetime64[ns]'))
+    known = (positions >= 0) & ~np.isnat(starts)
+    first = np.searchsorted(dates, starts[known], side='left')
+    after = np.where(np.isnat(ends[known]), len(dates), np.searchsorted(dates, ends[known], side='left'))
+    changes = np.zeros((len(dates) + 1, len(columns)), dtype=np.int32)
+    np.add.at(changes, (first, positions[known]), 1)
+    np.add.at(changes, (after, positions[known]), -1)
+    return np.cumsum(changes[:-1], axis=0) > 0
+
+
+def build_universe_mask(panel, path=None, membership=None, symbol_master=None, listed=None, delisted=None):
+    """Survivorship-free eligibility of every (date, symbol) of `panel`, saved next to it as `<path>_universe`.
+
+    Components, each stored as its own layer and ANDed on read:
+      'member'       index membership intervals (RIC, Join Date, Leave Date), e.g.
+                     `IndexConstituents().get_membership(index, start, end).intervals`; RICs are mapped to panel
+                     symbols through the node ids of `symbol_master`, aliases included. Symbols never in the index
+                     are ineligible throughout.
+      'listed'       on or after the listing date (`listing_dates()` by default).
+      'not_delisted' before the delisting date (`delisting_dates(panel)` by default).
+    """
+    path = panel.path if path is None else path
+    dates, symbols = panel.dates, panel.symbols
+    layers = {}
+    if membership is not None:
+        intervals = getattr(membership, 'intervals', membership)
+        # Both sides go through node ids, so old RICs and pre-rename tickers registered as aliases still match
+        panel_nodes = pd.DataFrame({'node': symbol_master.map_column(symbols, 'yahoo'), 'symbol': symbols})
+        members = pd.DataFrame({'node': symbol_master.map_column(intervals['RIC'], 'ric'),
+                                'start': pd.to_datetime(intervals['Join Date']).to_numpy(),
+                                'end': pd.to_datetime(intervals['Leave Date']).to_numpy()})
+        members = members.merge(panel_nodes[panel_nodes['node'] >= 0], on='node')
+        layers['member'] = interval_mask(dates, symbols, members['symbol'], members['start'], members['end'])
+    listed = listing_dates() if listed is None else listed
+    layers['listed'] = interval_mask(dates, symbols, listed.index, listed.to_numpy())
+    # Symbols without a known listing date are not excluded by it
+    layers['listed'][:, ~pd.Index(symbols).isin(listed.index)] = True
+    delisted = delisting_dates(panel) if delisted is None else delisted
+    layers['not_delisted'] = ~interval_mask(dates, symbols, delisted.index, delisted.to_numpy())
+    return save_universe_mask(layers, dates, symbols, path)
+
+
+def save_universe_mask(layers, dates, symbols, path):
+    """Writes {name: [T, N] bool} layers as `<path>_universe.npy` ([L, T, ceil(N / 8)] bits) plus an index."""
+    names = list(layers)
+    packed = np.stack([np.packbits(layers[name], axis=1) for name in names])
+    with open(f'{path}_universe.npy.tmp', 'wb') as f:
+        np.save(f, packed)
+    index = {
+        'dates': [d.strftime('%Y-%m-%d') for d in pd.DatetimeIndex(dates)],
+        'symbols': list(symbols),
+        'layers': names,
+    }
+    with open(f'{path}_universe.json.tmp', 'w') as f:
+        json.dump(index, f)
+    # Bits first and index last, as in publish_panel_cache; UniverseMask checks that the two agree
+    os.replace(f'{path}_universe.npy.tmp', f'{path}_universe.npy')
+    os.replace(f'{path}_universe.json.tmp', f'{path}_universe.json')
+    return UniverseMask(path)
+
+
+class UniverseMask:
+    """Read-only view of a universe mask built by `build_universe_mask`, aligned with the panel at `path`.
+
+    The bits stay packed in a memory map (950 symbols x 20 years is about 600 KB per layer); `mask` unpacks the
+    requested dates into a [T, N] bool array so callers filter with one vectorised AND, e.g.
+    `np.where(universe.mask()[..., None], panel.array, np.nan)`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(f'{path}_universe.json') as f:
+            index = json.load(f)
+        self.symbols = index['symbols']
+        self.layers = index['layers']
+        self.dates = pd.DatetimeIndex(index['dates'])
+        self.bits = np.load(f'{path}_universe.npy', mmap_mode='r')
+        expected = (len(self.layers), len(self.dates), (len(self.symbols) + 7) // 8)
+        if self.bits.shape != expected:
+            raise ValueError(f"{path}_universe.npy has shape {self.bits.shape} but its index describes {expected}; "
+                             f"the mask was rebuilt while being opened, open it again")
+
+    def check_aligned(self, panel):
+        """Raises ValueError unless the mask covers exactly the dates and symbols of `panel`, in the same order."""
+        for name, ours, theirs in (('dates', self.dates, panel.dates), ('symbols', self.symbols, panel.symbols)):
+            if not pd.Index(ours).equals(pd.Index(theirs)):
+                raise ValueError(f"Universe mask at {self.path} has {len(ours)} {name} that do not match the panel's "
+                                 f"{len(theirs)}; rebuild it with build_universe_mask(panel)")
+        return self
+
+    def date_slice(self, start=None, end=None):
+        lo = 0 if start is None else int(self.dates.searchsorted(pd.Timestamp(start), side='left'))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(pd.Timestamp(end), side='right'))
+        return slice(lo, hi)
+
+    def mask(self, start=None, end=None, layers=None):
+        """[T, N] bool: eligible under every layer in `layers` (all by default) on the dates in [start, end]."""
+        rows = self.date_slice(start, end)
+        ks = range(len(self.layers)) if layers is None else [self.layers.index(name) for name in layers]
+        packed = np.bitwise_and.reduce(self.bits[list(ks), rows], axis=0)
+        return np.unpackbits(packed, axis=1, count=len(self.symbols)).astype(bool)
+
+    def eligible(self, date):
+        """Symbols eligible on `date`."""
+        row = self.mask(date, date)
+        return [symbol for symbol, ok in zip(self.symbols, row[0]) if ok] if len(row) else []
+
+    def to_frame(self, start=None, end=None, layers=None):
+        rows = self.date_slice(start, end)
+        return pd.DataFrame(self.mask(start, end, layers), index=self.dates[rows], columns=self.symbols)
@@ -0,0 +1,143 @@
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.BulkDeals import _write_parquet, file_hash
+
+VALUE_CHAINS_DIR = 'data/eikon/valuechains'
+VALUE_CHAINS_CACHE_DIR = 'data/cache/value_chains'
+
+HEADER_ROW = 5
+TABLE_COLUMNS = {
+    'Identifier': 'counterparty_permid',
+    'Company Name': 'counterparty_name',
+    'Type': 'counterparty_type',
+    'Relationship': 'relationship',
+    'Country/Region': 'country',
+    'Industry': 'industry',
+    'Confidence Score (%)': 'weight',
+    'Last Update Date': 'last_update',
+}
+
+
+def parse_value_chain_workbook(path):
+    """One Eikon Value Chains export as (company_permid, counterparty_*, relationship, weight, last_update, as_of).
+
+    Layout of the sheet: the export time next to the title in the first row, the company's Organisation PermID
+    next to "Company Id" and the counterparty table under the header row.
+    """
+    sheet = pd.read_excel(path, header=None)
+    as_of = pd.Timestamp(sheet.iloc[0, 1])
+    labels = sheet.iloc[:HEADER_ROW, 0].astype(str).str.strip()
+    company_permid = int(sheet.iloc[labels[labels == 'Company Id'].index[0], 1])
+
+    table = sheet.iloc[HEADER_ROW + 1:].copy()
+    table.columns = sheet.iloc[HEADER_ROW].astype(str).str.strip()
+    table = table[list(TABLE_COLUMNS)].rename(columns=TABLE_COLUMNS).dropna(subset=['counterparty_permid'])
+
+    df = pd.DataFrame({
+        'company_permid': np.full(len(table), company_permid, dtype=np.int64),
+        'counterparty_permid': pd.to_numeric(table['counterparty_permid']).astype(np.int64).to_numpy(),
+        'counterparty_name': table['counterparty_name'].astype(str).to_numpy(),
+        'counterparty_type': table['counterparty_type'].astype(str).to_numpy(),
+        'relationship': table['relationship'].astype(str).str.strip().to_numpy(),
+        'country': table['country'].astype(str).to_numpy(),
+        'industry': table['industry'].astype(str).to_numpy(),
+        'weight': pd.to_numeric(table['weight'], errors='coerce').astype(np.float32).to_numpy(),
+        'last_update': pd.to_datetime(table['last_update'], errors='coerce').to_numpy(),
+        'as_of': np.full(len(table), as_of.to_datetime64()),
+    })
+    return df
+
+
+def to_edges(relationships, symbol_master=None):
+    """Directed supplier -> customer edges (source, target, relation, weight, as_of) from parsed workbooks.
+
+    A "Supplier" row of company C makes counterparty -> C, a "Customer" row C -> counterparty. With a symbol
+    master, PermIDs are mapped to node ids (source_node / target_node, -1 for counterparties outside it, such
+    as foreign suppliers).
+    """
+    is_supplier = (relationships['relationship'] == 'Supplier').to_numpy()
+    company = relationships['company_permid'].to_numpy()
+    counterparty = relationships['counterparty_permid'].to_numpy()
+    edges = pd.DataFrame({
+        'source': np.where(is_supplier, counterparty, company),
+        'target': np.where(is_supplier, company, counterparty),
+        'relation': pd.Categorical(np.where(is_supplier, 'supplier', 'customer'),
+                                   categories=['supplier', 'customer']),
+        'weight': relationships['weight'].to_numpy(),
+        'as_of': relationships['as_of'].to_numpy(),
+        'last_update': relationships['last_update'].to_numpy(),
+        'counterparty_name': relationships['counterparty_name'].astype('category'),
+    })
+    if symbol_master is not None:
+        edges['source_node'] = symbol_master.map_column(edges['source'].astype(str), 'permid').astype(np.int32)
+        edges['target_node'] = symbol_master.map_column(edges['target'].astype(str), 'permid').astype(np.int32)
+    return edges
+
+
+def load_value_chains(directory=VALUE_CHAINS_DIR, cache_dir=VALUE_CHAINS_CACHE_DIR, symbol_master=None,
+                      max_workers=None):
+    """Edge table of every workbook under `directory` (recursively), see `to_edges`.
+
+    Workbooks are parsed in a process pool and cached as Parquet fragments named after their content hash. A
+    manifest of (mtime, size, hash) per path means unchanged workbooks are not even rehashed, let alone reparsed.
+    The edge table itself is written to `<cache_dir>/edges.parquet`.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, '**', '*.xlsx'), recursive=True))
+    if not paths:
+        raise FileNotFoundError(f"No value-chain workbooks found in {directory}")
+
+    manifest = _read_manifest(cache_dir)
+    digests = {}
+    for path in paths:
+        stat = os.stat(path)
+        entry = manifest.get(path)
+        if entry is not None and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            digests[path] = entry['sha1']
+        else:
+            digests[path] = file_hash(path)
+            manifest[path] = {'mtime': stat.st_mtime, 'size': stat.st_size, 'sha1': digests[path]}
+
+    fragments = {}
+    missing = []
+    for path in paths:
+        cached = None if cache_dir is None else os.path.join(cache_dir, f'{digests[path]}.parquet')
+        if cached is not None and os.path.exists(cached):
+            fragments[path] = pd.read_parquet(cached)
+        else:
+            missing.append((path, cached))
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            parsed = pool.map(parse_value_chain_workbook, [path for path, _ in missing])
+            for (path, cached), df in zip(missing, parsed):
+                fragments[path] = df
+                if cached is not None:
+                    _write_parquet(df, cached)
+
+    relationships = pd.concat([fragments[path] for path in paths], ignore_index=True)
+    edges = to_edges(relationships, symbol_master)
+    if cache_dir is not None:
+        _write_parquet(edges, os.path.join(cache_dir, 'edges.parquet'))
+        _write_manifest(cache_dir, {path: manifest[path] for path in paths})
+    return edges
+
+
+def _read_manifest(cache_dir):
+    path = None if cache_dir is None else os.path.join(cache_dir, 'manifest.json')
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, 'manifest.json')
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(f'{path}.tmp', path)
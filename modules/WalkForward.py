@@ -0,0 +1,347 @@
+import json
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from modules.PanelCache import PanelCache
+from modules.TemporalSampler import HORIZONS
+from modules.UniverseMask import UniverseMask
+
+
+@dataclass(frozen=True)
+class Fold:
+    """Positions into the panel's dates: train on anchors [train_start, train_end), test on [test_start, test_end).
+
+    `train_end` is already purged: the longest-horizon target of the last training anchor ends before
+    `test_start`, so no training label overlaps the test period.
+    """
+    train_start: int
+    train_end: int
+    test_start: int
+    test_end: int
+
+
+def walk_forward_folds(num_dates, train_size, test_size, step=None, mode='expanding', purge=max(HORIZONS),
+                       start=0):
+    """Folds over `num_dates` snapshots, the first test period starting at `start + train_size`.
+
+    'expanding' trains on everything since `start`, 'rolling' on the last `train_size` dates only. Test periods
+    advance by `step` (default `test_size`) and never overlap when `step >= test_size`.
+    """
+    if mode not in ('expanding', 'rolling'):
+        raise ValueError(f"Unknown mode '{mode}', expected 'expanding' or 'rolling'")
+    step = test_size if step is None else step
+    folds = []
+    test_start = start + train_size
+    while test_start < num_dates:
+        train_start = start if mode == 'expanding' else test_start - train_size
+        folds.append(Fold(train_start, test_start - purge, test_start, min(test_start + test_size, num_dates)))
+        test_start += step
+    return folds
+
+
+def forward_returns(close, horizons=HORIZONS):
+    """[T, N, H] float32 log(close[t + h] / close[t]); NaN where t + h is past the end or a close is missing."""
+    log_close = np.log(np.asarray(close, dtype=np.float64))
+    targets = np.full(log_close.shape + (len(horizons),), np.nan, dtype=np.float32)
+    for k, h in enumerate(horizons):
+        targets[:-h, :, k] = log_close[h:] - log_close[:-h]
+    return targets
+
+
+def signal_metrics(signals, returns, horizons=HORIZONS, quantile=0.2):
+    """Per-horizon IC, rank IC, hit rate and top-minus-bottom quantile return of [T, N, H] signals.
+
+    IC and rank IC are daily cross-sectional Pearson / Spearman correlations averaged over days (with their
+    information ratio); the hit rate is the share of (day, stock) pairs where the signal has the return's sign.
+    `long_short` is the mean h-day return of the top `quantile` minus the bottom one, `long_short_sharpe` its
+    annualised Sharpe ratio over every h-th day (non-overlapping holding periods).
+    """
+    rows = {}
+    with warnings.catch_warnings():
+        # Days (or whole trailing folds) without observed returns give empty means; they are reported as NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for k, h in enumerate(horizons):
+            s, r = signals[:, :, k].astype(np.float64), returns[:, :, k].astype(np.float64)
+            valid = ~(np.isnan(s) | np.isnan(r))
+            s, r = np.where(valid, s, np.nan), np.where(valid, r, np.nan)
+            ic = _cross_sectional_correlation(s, r)
+            rank_ic = _cross_sectional_correlation(_rank(s), _rank(r))
+            long_short = _long_short(s, r, quantile)
+            periods = long_short[::h]
+            hits = np.sign(s[valid]) == np.sign(r[valid])
+            rows[f'{h}d'] = {
+                'ic': np.nanmean(ic),
+                'ic_ir': np.nanmean(ic) / np.nanstd(ic) if np.nanstd(ic) > 0 else np.nan,
+                'rank_ic': np.nanmean(rank_ic),
+                'rank_ic_ir': np.nanmean(rank_ic) / np.nanstd(rank_ic) if np.nanstd(rank_ic) > 0 else np.nan,
+                'hit_rate': hits.mean() if len(hits) else np.nan,
+                'long_short': np.nanmean(long_short),
+                'long_short_sharpe': (np.nanmean(periods) / np.nanstd(periods) * np.sqrt(252 / h)
+                                      if np.nanstd(periods) > 0 else np.nan),
+                'days': int(np.sum(~np.isnan(ic))),
+            }
+    return pd.DataFrame(rows).T
+
+
+def _cross_sectional_correlation(a, b):
+    """Row-wise Pearson correlation of two [T, N] arrays with matching NaNs (NaN for rows with < 3 values)."""
+    count = np.sum(~np.isnan(a), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a = a - np.nanmean(a, axis=1, keepdims=True)
+        b = b - np.nanmean(b, axis=1, keepdims=True)
+        correlation = np.nansum(a * b, axis=1) / np.sqrt(np.nansum(a * a, axis=1) * np.nansum(b * b, axis=1))
+    correlation[count < 3] = np.nan
+    return correlation
+
+
+def _rank(a):
+    return pd.DataFrame(a).rank(axis=1).to_numpy()
+
+
+def _long_short(s, r, quantile):
+    ranks = _rank(s) / np.sum(~np.isnan(s), axis=1, keepdims=True)
+    with np.errstate(invalid='ignore'):
+        top = np.where(ranks > 1 - quantile, r, np.nan)
+        bottom = np.where(ranks <= quantile, r, np.nan)
+    return np.nanmean(top, axis=1) - np.nanmean(bottom, axis=1)
+
+
+# Per-process state of the pool workers: memory maps opened once and shared by every fold a worker runs
+_WORKER = {}
+
+
+def _init_worker(panel_path, targets_path, graph_path, fields, universe):
+    import torch
+
+    torch.set_num_threads(1)
+    panel = PanelCache(panel_path)
+    _WORKER['x'] = panel.window(fields=fields)
+    _WORKER['y'] = np.load(targets_path, mmap_mode='r')
+    _WORKER['universe'] = UniverseMask(panel_path).check_aligned(panel).mask() if universe else None
+    if graph_path is not None:
+        from modules.RelationalGraph import RelationalGraph
+
+        _WORKER['graph'] = RelationalGraph.load(graph_path)
+    else:
+        _WORKER['graph'] = None
+
+
+def _run_fold(model, fold, params):
+    start = time.perf_counter()
+    x, y = _WORKER['x'], _WORKER['y']
+    x_train = np.nan_to_num(np.asarray(x[fold.train_start:fold.train_end], dtype=np.float32))
+    x_test = np.nan_to_num(np.asarray(x[fold.test_start:fold.test_end], dtype=np.float32))
+    y_train = np.asarray(y[fold.train_start:fold.train_end])
+    universe = _WORKER['universe']
+    if universe is not None:
+        # Ineligible (date, symbol) pairs neither train the model nor get a signal to be scored on
+        y_train = np.where(universe[fold.train_start:fold.train_end, :, None], y_train, np.nan)
+    predictions = MODELS[model](x_train, y_train, x_test, _WORKER['graph'], **params).astype(np.float32)
+    if universe is not None:
+        predictions[~universe[fold.test_start:fold.test_end]] = np.nan
+    return fold, predictions, time.perf_counter() - start
+
+
+def _ridge(x_train, y_train, x_test, graph, alpha=1.0):
+    """Pooled ridge regression of every horizon on the node's own features.
+
+    Features are standardised on the fold's training rows, so `alpha` shrinks every coefficient alike whatever the
+    feature's units; the intercept is not penalised. Horizons without an observed training target are NaN.
+    """
+    features, horizons = x_train.shape[-1], y_train.shape[-1]
+    a, b = x_train.reshape(-1, features).astype(np.float64), y_train.reshape(-1, horizons)
+    penalty = alpha * np.eye(features + 1)
+    penalty[-1, -1] = 0.0
+    predictions = np.full(x_test.shape[:2] + (horizons,), np.nan)
+    for k in range(horizons):
+        observed = ~np.isnan(b[:, k])
+        if not observed.any():
+            continue
+        rows = a[observed]
+        mean, scale = rows.mean(axis=0), rows.std(axis=0)
+        scale[scale == 0] = 1.0
+        design = np.c_[(rows - mean) / scale, np.ones(len(rows))]
+        coefficients = np.linalg.solve(design.T @ design + penalty, design.T @ b[observed, k])
+        predictions[:, :, k] = ((x_test - mean) / scale) @ coefficients[:-1] + coefficients[-1]
+    return predictions
+
+
+def _tree_model(estimator):
+    def fit_predict(x_train, y_train, x_test, graph, **params):
+        features, horizons = x_train.shape[-1], y_train.shape[-1]
+        a, b = x_train.reshape(-1, features), y_train.reshape(-1, horizons)
+        predictions = np.empty(x_test.shape[:2] + (horizons,))
+        for k in range(horizons):
+            observed = ~np.isnan(b[:, k])
+            model = estimator(**params).fit(a[observed], b[observed, k])
+            predictions[:, :, k] = model.predict(x_test.reshape(-1, features)).reshape(x_test.shape[:2])
+        return predictions
+    return fit_predict
+
+
+def _random_forest(**params):
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(**{'n_estimators': 100, 'min_samples_leaf': 100, 'n_jobs': 1, **params})
+
+
+def _lightgbm(**params):
+    from lightgbm import LGBMRegressor
+
+    return LGBMRegressor(**{'n_estimators': 200, 'learning_rate': 0.05, 'n_jobs': 1, 'verbose': -1, **params})
+
+
+def _xgboost(**params):
+    from xgboost import XGBRegressor
+
+    return XGBRegressor(**{'n_estimators': 200, 'learning_rate': 0.05, 'n_jobs': 1, **params})
+
+
+def _relational_gnn(x_train, y_train, x_test, graph, hidden_dim=32, epochs=3, lr=1e-2, seed=0):
+    """RelationalGNN trained full-graph, one step per training snapshot; missing or ineligible (NaN) targets are
+    left out of the loss."""
+    import torch
+
+    from modules.GraphModels import RelationalGNN
+    from modules.NeighbourSampling import fit
+
+    torch.manual_seed(seed)
+    model = RelationalGNN(x_train.shape[-1], hidden_dim, y_train.shape[-1], len(graph.relations))
+    fit(model, torch.from_numpy(x_train), torch.from_numpy(np.nan_to_num(y_train)), graph, epochs=epochs, lr=lr,
+        seed=seed, mask=~np.isnan(y_train))
+    adjacencies = graph.to_torch()
+    with torch.inference_mode():
+        return np.stack([model(torch.from_numpy(x), adjacencies).numpy() for x in x_test])
+
+
+# name -> fit_predict(x_train [T, N, F], y_train [T, N, H], x_test, graph, **params) -> [T_test, N, H]
+MODELS = {
+    'ridge': _ridge,
+    'random_forest': _tree_model(_random_forest),
+    'lightgbm': _tree_model(_lightgbm),
+    'xgboost': _tree_model(_xgboost),
+    'relational_gnn': _relational_gnn,
+}
+
+
+@dataclass
+class WalkForwardReport:
+    model: str
+    folds: list
+    predictions: np.ndarray
+    metrics: pd.DataFrame
+    fold_metrics: pd.DataFrame
+    seconds: float
+    fold_seconds: list = field(default_factory=list)
+
+    def summary(self):
+        lines = [f"{self.model}: {len(self.folds)} folds in {self.seconds:.1f}s "
+                 f"(slowest fold {max(self.fold_seconds, default=0):.1f}s)"]
+        lines.append(self.metrics.to_string(float_format=lambda v: f'{v:.4f}'))
+        return '\n'.join(lines)
+
+
+class WalkForwardEngine:
+    """Walk-forward backtests of the MODELS over a PanelCache, folds running in a process pool.
+
+    Forward returns of `close_field` are computed once and written next to the panel (`<path>_targets.npy`, with the
+    close field and horizons they were built for in `<path>_targets.json`); the
+    panel, the targets and the optional RelationalGraph (saved to `<path>_graph.npz`) are then opened once per
+    worker as memory maps, so folds share the page cache instead of each rebuilding or pickling features.
+
+    With `universe=True` the UniverseMask saved next to the panel (see `build_universe_mask`) restricts training
+    targets and scored signals to eligible (date, symbol) pairs, for a survivorship-free backtest.
+    """
+
+    def __init__(self, panel_path, fields, close_field='close', horizons=HORIZONS, graph=None, universe=False,
+                 max_workers=None):
+        self.panel_path = panel_path
+        self.panel = PanelCache(panel_path)
+        self.fields = list(fields)
+        self.horizons = tuple(horizons)
+        self.universe = universe
+        self.max_workers = max_workers
+        self.targets_path = f'{panel_path}_targets.npy'
+        self.targets = self._cached_targets(close_field)
+        if universe:
+            # Checked here too, so a stale mask fails before the pool starts rather than inside every worker
+            UniverseMask(panel_path).check_aligned(self.panel)
+        self.graph_path = None
+        if graph is not None:
+            self.graph_path = f'{panel_path}_graph.npz'
+            graph.save(self.graph_path)
+
+    def _cached_targets(self, close_field):
+        key = {'close_field': close_field, 'horizons': list(self.horizons)}
+        key_path = f'{self.panel_path}_targets.json'
+        targets = self._load_targets(key, key_path)
+        if targets is None:
+            np.save(f'{self.targets_path}.tmp.npy', forward_returns(self.panel.field(close_field), self.horizons))
+            with open(f'{key_path}.tmp', 'w') as f:
+                json.dump(key, f)
+            # Targets first, key last: a crash in between leaves a key that no longer matches, never a stale reuse
+            os.replace(f'{self.targets_path}.tmp.npy', self.targets_path)
+            os.replace(f'{key_path}.tmp', key_path)
+            targets = np.load(self.targets_path, mmap_mode='r')
+        return targets
+
+    def _load_targets(self, key, key_path):
+        """The cached targets if they were built from the current panel for `key`, else None."""
+        if not (os.path.exists(self.targets_path) and os.path.exists(key_path)):
+            return None
+        if os.path.getmtime(self.targets_path) < os.path.getmtime(f'{self.panel_path}.npy'):
+            return None
+        with open(key_path) as f:
+            if json.load(f) != key:
+                return None
+        targets = np.load(self.targets_path, mmap_mode='r')
+        expected = self.panel.shape[:2] + (len(self.horizons),)
+        return targets if targets.shape == expected else None
+
+    def folds(self, train_size=756, test_size=63, step=None, mode='expanding'):
+        return walk_forward_folds(len(self.panel.dates), train_size, test_size, step, mode, max(self.horizons))
+
+    def run(self, model, folds, quantile=0.2, **params):
+        folds = list(folds)
+        if not folds:
+            raise ValueError("No folds to run: the panel has too few dates for the requested train and test sizes")
+        if model == 'relational_gnn' and self.graph_path is None:
+            raise ValueError("Model 'relational_gnn' needs a RelationalGraph; pass graph= to WalkForwardEngine")
+        start = time.perf_counter()
+        num_dates, num_symbols = len(self.panel.dates), len(self.panel.symbols)
+        predictions = np.full((num_dates, num_symbols, len(self.horizons)), np.nan, dtype=np.float32)
+        fold_rows, fold_seconds = [], []
+        with ProcessPoolExecutor(self.max_workers, initializer=_init_worker,
+                                 initargs=(self.panel_path, self.targets_path, self.graph_path, self.fields,
+                                           self.universe)) as pool:
+            jobs = [pool.submit(_run_fold, model, fold, params) for fold in folds]
+            for job in jobs:
+                fold, fold_predictions, seconds = job.result()
+                predictions[fold.test_start:fold.test_end] = fold_predictions
+                fold_seconds.append(seconds)
+                metrics = signal_metrics(fold_predictions, self.targets[fold.test_start:fold.test_end],
+                                         self.horizons, quantile)
+                metrics.insert(0, 'test_start', self.panel.dates[fold.test_start])
+                fold_rows.append(metrics)
+
+        tested = slice(min(f.test_start for f in folds), max(f.test_end for f in folds))
+        return WalkForwardReport(
+            model=model,
+            folds=folds,
+            predictions=predictions,
+            metrics=signal_metrics(predictions[tested], self.targets[tested], self.horizons, quantile),
+            fold_metrics=pd.concat(fold_rows).rename_axis('horizon').reset_index(),
+            seconds=time.perf_counter() - start,
+            fold_seconds=fold_seconds,
+        )
+
+    def signals(self, report, horizon):
+        """Date x symbol DataFrame of one horizon's out-of-sample predictions."""
+        k = self.horizons.index(horizon)
+        return pd.DataFrame(report.predictions[:, :, k], index=self.panel.dates, columns=self.panel.symbols)